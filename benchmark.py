@@ -0,0 +1,421 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+# Stages timed at each mesh, in the order they run
+STAGES = ['load_cold', 'load_warm', 'pose', 'transform', 'project', 'draw', 'plot_view', 'plot', 'plot_edges']
+
+# Triangles of the synthetic meshes benchmarked by default, up to 10M can be given with --sizes
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Bundled meshes benchmarked along with the synthetic ones
+BUNDLED_MESHES = [os.path.join('public', 'stl', name) for name in ['coin.STL', 'link.STL']]
+
+# Modules the headless renderers start from, each one is imported at a fresh interpreter and timed
+CORE_MODULES = ['models.Camera', 'controllers.RenderController', 'render']
+
+# GUI, plotting and image packages the core modules must leave to be imported on their first use
+LAZY_PACKAGES = ['PyQt5', 'matplotlib', 'mpl_toolkits', 'scipy', 'cv2', 'stl']
+
+# Seconds each core module may take to import, along with NumPy
+IMPORT_BUDGET = 0.5
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Times the load, pose, transform, projection and draw stages '
+                                                 'of the rendering pipeline, headless.')
+    parser.add_argument('mesh_paths', nargs='*', metavar='mesh_path',
+                        help='STL files benchmarked instead of the bundled and synthetic meshes')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='comma separated triangles counts of the synthetic meshes, none when empty')
+    parser.add_argument('--stages', default=','.join(STAGES), help='comma separated stages to time')
+    parser.add_argument('--repeats', type=int, default=5, help='runs of each stage, the median time is reported')
+    parser.add_argument('--precision', choices=['float64', 'float32'], default='float64',
+                        help='floating point type the meshes are loaded, moved and projected at')
+    parser.add_argument('--feature-angle', type=float,
+                        help='the plot_edges stage draws only the edges whose faces meet at this angle or more')
+    parser.add_argument('--work-dir', default=os.path.join(tempfile.gettempdir(), 'projection-benchmark'),
+                        help='directory where the synthetic meshes are written, they are kept for the next runs')
+    parser.add_argument('--output', default='benchmark.json', help='JSON file the results are written to')
+    parser.add_argument('--compare', help='JSON file of previous results, the stages slower than --threshold '
+                                          'times their previous time are reported as regressions')
+    parser.add_argument('--threshold', type=float, default=1.2)
+    parser.add_argument('--workers', default='',
+                        help='comma separated workers counts the parallel trajectory renderer is timed with, against '
+                             'the serial one, none when empty')
+    parser.add_argument('--trajectory-frames', type=int, default=200, help='frames of the timed trajectories')
+    parser.add_argument('--import-budget', type=float, default=IMPORT_BUDGET,
+                        help='seconds each core module may take to import, along with NumPy')
+    parser.add_argument('--case', help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(argv):
+    args = parse_args(argv)
+    stages = [stage for stage in args.stages.split(',') if stage]
+    if args.case is not None:
+        # Benchmarks a single mesh, as a child process of the suite
+        workers_counts = [int(workers) for workers in args.workers.split(',') if workers]
+        print(json.dumps(run_case(args.case, stages, args.repeats, np.dtype(args.precision).type,
+                                  args.feature_angle, workers_counts, args.trajectory_frames)))
+        return 0
+
+    mesh_paths = args.mesh_paths or [
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), mesh_path) for mesh_path in BUNDLED_MESHES
+    ] + [
+        write_synthetic_mesh(args.work_dir, int(size)) for size in args.sizes.split(',') if size
+    ]
+
+    # The import time budget is checked first, as it holds with no mesh
+    imports = measure_imports(args.repeats)
+    failures = print_imports(imports, args.import_budget)
+
+    # Each mesh is benchmarked at its own process, so its peak memory isn't shared with the others
+    results = []
+    for mesh_path in mesh_paths:
+        case = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), '--case', mesh_path, '--stages', ','.join(stages),
+             '--repeats', str(args.repeats), '--precision', args.precision, '--workers', args.workers,
+             '--trajectory-frames', str(args.trajectory_frames)]
+            + ([] if args.feature_angle is None else ['--feature-angle', str(args.feature_angle)]),
+            stdout=subprocess.PIPE,
+            check=True
+        )
+        result = json.loads(case.stdout)
+        print_result(result)
+        results.append(result)
+
+    report = {
+        'commit': get_commit(),
+        'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'precision': args.precision,
+        'feature_angle': args.feature_angle,
+        'repeats': args.repeats,
+        'imports': imports,
+        'results': results,
+    }
+    with open(args.output, 'w') as output_file:
+        json.dump(report, output_file, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as previous_file:
+            failures += compare(json.load(previous_file), report, args.threshold)
+    return 1 if failures else 0
+
+
+def measure_imports(repeats: int):
+    # Median import time of each core module at a fresh interpreter, with the lazy packages it has loaded
+    script = (
+        'import json, sys, time\n'
+        'start_time = time.perf_counter()\n'
+        'import {}\n'
+        'seconds = time.perf_counter() - start_time\n'
+        'print(json.dumps([seconds, sorted(set(sys.modules) & set({}))]))'
+    )
+    imports = {}
+    for module in CORE_MODULES:
+        runs = [
+            json.loads(subprocess.run(
+                [sys.executable, '-c', script.format(module, LAZY_PACKAGES)],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stdout=subprocess.PIPE,
+                check=True
+            ).stdout)
+            for _ in range(repeats)
+        ]
+        imports[module] = {
+            'seconds': float(np.median([seconds for seconds, _ in runs])),
+            'packages': runs[-1][1],
+        }
+    return imports
+
+
+def write_synthetic_mesh(work_dir: str, triangles_count: int):
+    # Writes (once) a binary STL torus with about the triangles count, sized like the bundled meshes
+    from models.StlLoader import HEADER_SIZE, RECORD_DTYPE
+
+    mesh_path = os.path.join(work_dir, 'torus_{}.stl'.format(triangles_count))
+    if os.path.exists(mesh_path):
+        return mesh_path
+
+    # A grid of n x n quads around the torus, each one split in two triangles
+    n = max(int(np.ceil(np.sqrt(triangles_count / 2))), 3)
+    angles = 2 * np.pi * np.arange(n + 1) / n
+    u, v = np.meshgrid(angles, angles, indexing='ij')
+    points = np.stack([
+        (20 + 8 * np.cos(v)) * np.cos(u),
+        (20 + 8 * np.cos(v)) * np.sin(u),
+        8 * np.sin(v),
+    ], axis=-1).astype(np.float32)
+    a, b, c, d = points[:-1, :-1], points[1:, :-1], points[1:, 1:], points[:-1, 1:]
+    triangles = np.concatenate([np.stack([a, b, c], axis=-2), np.stack([a, c, d], axis=-2)]).reshape(-1, 3, 3)
+
+    records = np.zeros(triangles.shape[0], dtype=RECORD_DTYPE)
+    records['vertices'] = triangles
+    normals = np.cross(triangles[:, 1] - triangles[:, 0], triangles[:, 2] - triangles[:, 0])
+    records['normal'] = normals / np.maximum(np.linalg.norm(normals, axis=1, keepdims=True), 1e-30)
+
+    os.makedirs(work_dir, exist_ok=True)
+    temporary_path = mesh_path + '.tmp'
+    with open(temporary_path, 'wb') as mesh_file:
+        mesh_file.write(b'\0' * (HEADER_SIZE - 4))
+        mesh_file.write(np.uint32(records.size).tobytes())
+        records.tofile(mesh_file)
+    os.replace(temporary_path, mesh_path)
+    return mesh_path
+
+
+def run_case(
+        mesh_path: str,
+        stages: list,
+        repeats: int,
+        dtype: type,
+        feature_angle: float = None,
+        workers_counts: list = (),
+        trajectory_frames: int = 200
+):
+    # Times every stage at the mesh, each one is run the repeats and then once more traced for its peak memory.
+    # The pose changes before each run (untimed) of the stages computed from it, so nothing is read from a cache
+    from controllers.RenderController import RenderController
+    from models.Actor import Actor
+    from models.Camera import Camera
+    from models.LevelOfDetail import LevelOfDetail
+    from render import DEFAULT_CAMERA_POSE, DEFAULT_CAMERA_PARAMS
+
+    actor = Actor(mesh_path=mesh_path, dtype=dtype)
+    controller = RenderController(actor=actor, camera=Camera())
+    controller.set_pose(camera_pose=DEFAULT_CAMERA_POSE, camera_params=DEFAULT_CAMERA_PARAMS)
+    controller.scene.feature_angle = feature_angle
+    plot_axes = {}
+    angles = iter(range(1, 2 ** 31))
+
+    def move_actor():
+        # Each move sets a new pose, turning the actor one more degree
+        controller.move_actor(target_coordinate=np.zeros(3), rotation_angle=next(angles) % 360, rotation_axis='z',
+                              reference_axis='world')
+
+    def load_cold():
+        shutil.rmtree(mesh_path + '.cache', ignore_errors=True)
+        LevelOfDetail.from_file(mesh_path, dtype)
+
+    def plot(wireframe: str):
+        # Draws the world and camera views with the wireframe at a headless matplotlib figure, as the main view
+        # does. Each wireframe has its own figure
+        def run():
+            controller.scene.wireframe = wireframe
+            if wireframe not in plot_axes:
+                from matplotlib.backends.backend_agg import FigureCanvasAgg
+                from matplotlib.figure import Figure
+                figure = Figure(figsize=(10, 5), dpi=100)
+                FigureCanvasAgg(figure)
+                plot_axes[wireframe] = [figure.add_subplot(1, 2, 1, projection='3d'), figure.add_subplot(1, 2, 2)]
+            world_axis, view_axis = plot_axes[wireframe]
+            controller.draw_world_components(world_axis)
+            controller.draw_camera_view(view_axis)
+            world_axis.figure.canvas.draw()
+        return run
+
+    def plot_view():
+        # Draws only the camera view with matplotlib, at a figure of the raster size, as it was drawn before the
+        # raster replaced it. Timed against the draw stage
+        if 'view' not in plot_axes:
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+            figure = Figure(figsize=(controller.raster.width / 100, controller.raster.height / 100), dpi=100)
+            FigureCanvasAgg(figure)
+            plot_axes['view'] = figure.add_subplot()
+        controller.scene.wireframe = 'polyline'
+        controller.draw_camera_view(plot_axes['view'])
+        plot_axes['view'].figure.canvas.draw()
+
+    stage_runs = {
+        'load_cold': (None, load_cold),
+        'load_warm': (None, lambda: LevelOfDetail.from_file(mesh_path, dtype)),
+        'pose': (None, move_actor),
+        'transform': (move_actor, lambda: actor.vertices),
+        'project': (move_actor, lambda: controller.camera.project_vertices(actor)),
+        'draw': (move_actor, lambda: controller.draw_camera_image(controller.raster)),
+        'plot_view': (move_actor, plot_view),
+        'plot': (move_actor, plot('polyline')),
+        'plot_edges': (move_actor, plot('edges')),
+    }
+
+    triangles_count = int(actor.mesh.faces.shape[0])
+    result = {
+        'mesh': os.path.basename(mesh_path),
+        'triangles': triangles_count,
+        'vertices': int(actor.mesh.vertices.shape[0]),
+        'segments': {
+            'polyline': int(actor.mesh.indices.size - 1),
+            'edges': int(actor.mesh.edges.shape[0]),
+            'feature_edges': int(actor.mesh.get_edges(feature_angle).shape[0]),
+        },
+        'stages': {},
+    }
+    for stage in stages:
+        setup, run = stage_runs[stage]
+        if stage in ['plot_view', 'plot', 'plot_edges']:
+            # The first plot creates the drawn lines, the next ones move them as the main view does
+            run()
+        seconds = []
+        for _ in range(repeats):
+            if setup is not None:
+                setup()
+            start_time = time.perf_counter()
+            run()
+            seconds.append(time.perf_counter() - start_time)
+
+        if setup is not None:
+            setup()
+        tracemalloc.start()
+        run()
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        median_seconds = float(np.median(seconds))
+        result['stages'][stage] = {
+            'seconds': median_seconds,
+            'min_seconds': float(np.min(seconds)),
+            'triangles_per_second': triangles_count / max(median_seconds, 1e-12),
+            'peak_bytes': peak_bytes,
+        }
+
+    result['peak_rss_bytes'] = get_peak_rss()
+    result['image_pixels'] = int(np.count_nonzero(controller.draw_camera_image(controller.raster)))
+
+    # Timed after the peak memory is read, as the parallel renderer maps its whole shared buffer
+    if workers_counts:
+        result['trajectory'] = time_trajectory(controller, trajectory_frames, workers_counts)
+    return result
+
+
+def time_trajectory(controller, frames_count: int, workers_counts: list):
+    # Frames per second of the serial trajectory renderer and of the parallel one with each workers count (process
+    # pool start included), the actor turning a degree each frame. The frames are only streamed through
+    from models.Pose import Pose
+    from models.Trajectory import Trajectory
+
+    angles = np.arange(frames_count, dtype=float)
+    trajectory = Trajectory(
+        actor_matrices=Pose.from_axis_angle(np.broadcast_to([0.0, 0.0, 1.0], (frames_count, 3)), angles).to_matrix(),
+        camera_matrices=np.broadcast_to(controller.camera.pose, (frames_count, 4, 4))
+    )
+
+    def get_fps(frames):
+        start_time = time.perf_counter()
+        for _ in frames:
+            pass
+        return frames_count / (time.perf_counter() - start_time)
+
+    return {
+        'frames': frames_count,
+        'serial_fps': get_fps(controller.render_trajectory(trajectory)),
+        'workers_fps': {
+            str(workers): get_fps(controller.render_trajectory_parallel(trajectory, workers=workers))
+            for workers in workers_counts
+        },
+    }
+
+
+def get_peak_rss():
+    # Peak resident memory of the process, None where it can't be read
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def get_commit():
+    # Commit the benchmarked tree is at, None outside a git repository
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            check=True
+        ).stdout.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result: dict):
+    print('{} ({} triangles, peak RSS {:.1f} MB)'.format(result['mesh'], result['triangles'],
+                                                          (result['peak_rss_bytes'] or 0) / 2 ** 20), file=sys.stderr)
+    print('  segments: {polyline} polyline, {edges} edges, {feature_edges} feature edges'.format(**result['segments']),
+          file=sys.stderr)
+    for stage, timing in result['stages'].items():
+        print('  {:<10} {:>10.3f} ms {:>14.3g} triangles/s {:>10.1f} MB peak'.format(
+            stage, 1000 * timing['seconds'], timing['triangles_per_second'], timing['peak_bytes'] / 2 ** 20
+        ), file=sys.stderr)
+    if 'trajectory' in result:
+        trajectory = result['trajectory']
+        print('  trajectory {} frames: serial {:.1f} fps{}'.format(
+            trajectory['frames'],
+            trajectory['serial_fps'],
+            ''.join(', {} workers {:.1f} fps ({:.2f}x)'.format(workers, fps, fps / trajectory['serial_fps'])
+                    for workers, fps in trajectory['workers_fps'].items())
+        ), file=sys.stderr)
+    if 'draw' in result['stages'] and 'plot_view' in result['stages']:
+        print('  camera image drawn {:.1f}x faster than the matplotlib camera view'.format(
+            result['stages']['plot_view']['seconds'] / max(result['stages']['draw']['seconds'], 1e-12)
+        ), file=sys.stderr)
+
+
+def print_imports(imports: dict, budget: float):
+    # Prints the import time of each core module, returns how many of them are over the budget or load a lazy package
+    failures = 0
+    print('imports (budget {:.0f} ms)'.format(1000 * budget), file=sys.stderr)
+    for module, timing in imports.items():
+        over_budget = timing['seconds'] > budget
+        failures += over_budget or bool(timing['packages'])
+        print('  {:<30} {:>8.1f} ms{}{}'.format(
+            module,
+            1000 * timing['seconds'],
+            '  OVER BUDGET' if over_budget else '',
+            '  LOADS ' + ', '.join(timing['packages']) if timing['packages'] else ''
+        ), file=sys.stderr)
+    return failures
+
+
+def compare(previous: dict, current: dict, threshold: float):
+    # Prints the time ratio of each stage to the previous results, returns 1 when any of them regressed
+    previous_stages = {
+        (result['mesh'], stage): timing['seconds']
+        for result in previous['results'] for stage, timing in result['stages'].items()
+    }
+    regressions = 0
+    print('compared to {}'.format(previous.get('commit')), file=sys.stderr)
+    for result in current['results']:
+        for stage, timing in result['stages'].items():
+            previous_seconds = previous_stages.get((result['mesh'], stage))
+            if previous_seconds is None:
+                continue
+            ratio = timing['seconds'] / max(previous_seconds, 1e-12)
+            regressed = ratio > threshold
+            regressions += regressed
+            print('  {:<16} {:<10} {:>6.2f}x{}'.format(
+                result['mesh'], stage, ratio, '  REGRESSION' if regressed else ''
+            ), file=sys.stderr)
+
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
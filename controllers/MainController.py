@@ -1,3 +1,5 @@
+import threading
+import time
 from math import pi, cos, sin
 
 import numpy as np
@@ -5,13 +7,69 @@ import numpy as np
 from models.Actor import Actor
 from models.Axis import Axis
 from models.Camera import Camera
+from models.Pose import Pose
+from models.Profiler import Profiler
+from models.CameraRig import CameraRig
+from models.Raster import Raster
+from models.Scene import Scene
+from models.Trajectory import Trajectory
+
+# Scene components each view depends on
+VIEW_DEPENDENCIES = {
+    'world': {'actor', 'camera'},
+    'camera_view': {'actor', 'camera', 'camera_params', 'picked_face'},
+    'camera_grid': {'actor', 'camera', 'camera_params'},
+}
+
+# Camera image values of the faces seen edge on and facing the camera
+SHADING_RANGE = (48, 255)
+
+# Seconds each frame may take while the controls are being changed, the level of detail is chosen from it
+INTERACTIVE_FRAME_BUDGET = 1 / 30
+
+# Rotation matrices about each axis of the integer degree angles the dial sets (0 to 360), read only
+ROTATION_TABLE = {axis: Trajectory.get_rotation_matrices(np.arange(361), axis) for axis in 'xyz'}
+for rotation_matrices in ROTATION_TABLE.values():
+    rotation_matrices.flags.writeable = False
 
 
 class MainController:
-    def __init__(self, actor: Actor, camera: Camera):
+    def __init__(self, actor: Actor, camera: Camera, scene: Scene = None, rig: CameraRig = None):
+        # The actor and the camera are the ones moved by the controls, the scene holds every actor drawn
+        # (it's the only one when no scene is given) and the rig every camera whose image is drawn
+        if scene is None:
+            scene = Scene()
+            scene.add(actor)
         self.actor = actor
+        self.scene = scene
         self.camera = camera
         self.world_axis = Axis()
+        self.raster = Raster()
+        self.camera_image = None
+        self.picked_actor = None
+        self.picked_face = None
+
+        # Timing spans of the frame stages, enabled from the main view or the command line
+        self.profiler = Profiler()
+
+        # Simplified meshes are drawn while the controls are being changed, the level is chosen from
+        # the measured frame time of each level
+        self.interactive = False
+        self.frame_times = {}
+
+        # Changed scene components not yet redrawn at each view, and the axes they're drawn at. The components
+        # are marked at the GUI thread and taken by the frames prepared at the worker thread, under the lock
+        self.dirty = {view: set(dependencies) for view, dependencies in VIEW_DEPENDENCIES.items()}
+        self.dirty_lock = threading.Lock()
+        self.plot_axes = {view: None for view in VIEW_DEPENDENCIES}
+        self.set_rig(rig or CameraRig([camera]))
+
+    def invalidate(self, component: str):
+        # Marks the views that depend on the scene component as dirty
+        with self.dirty_lock:
+            for view, dependencies in VIEW_DEPENDENCIES.items():
+                if component in dependencies:
+                    self.dirty[view].add(component)
 
     def update_camera_params(
             self,
@@ -22,18 +80,23 @@ class MainController:
             ox: float = 0,
             oy: float = 0,
     ):
+        if (f, sx, sy, so, ox, oy) == (self.camera.f, self.camera.sx, self.camera.sy,
+                                       self.camera.so, self.camera.ox, self.camera.oy):
+            return
+
         self.camera.f = f
         self.camera.sx = sx
         self.camera.sy = sy
         self.camera.so = so
         self.camera.ox = ox
         self.camera.oy = oy
+        self.invalidate('camera_params')
 
     def move_camera(
             self,
             target_coordinate: np.ndarray = None,
             rotation_angle: float = None,
-            rotation_axis: str = None,
+            rotation_axis: [str, np.ndarray] = None,
             reference_axis: str = None
     ):
         self.move_object(
@@ -48,7 +111,7 @@ class MainController:
             self,
             target_coordinate: np.ndarray = None,
             rotation_angle: float = None,
-            rotation_axis: str = None,
+            rotation_axis: [str, np.ndarray] = None,
             reference_axis: str = None
     ):
         self.move_object(
@@ -59,88 +122,358 @@ class MainController:
             reference_axis
         )
 
-    def draw_camera_view(self, plot_axis):
-        plot_axis.clear()
-        self.camera.get_camera_view(plot_axis, self.actor)
-        plot_axis.invert_yaxis()
+    def draw_camera_view(self, plot_axis, frame: dict = None):
+        # Redraws the camera view, returns whether anything has changed. Given a prepared frame, the view is drawn
+        # from its data (and its camera image is the one shown) when it was prepared for it
+        dirty, camera_view = self.__get_frame_view(frame, 'camera_view')
+        projected_wireframe = None if camera_view is None else camera_view['wireframe']
+        if self.plot_axes['camera_view'] is not plot_axis:
+            with self.profiler.span('plot_clear'):
+                plot_axis.clear()
+            with self.profiler.span('plot_camera_view'):
+                self.camera.get_camera_view(plot_axis, self.scene, projected_wireframe)
+                plot_axis.invert_yaxis()
+            self.plot_axes['camera_view'] = plot_axis
+        elif dirty:
+            with self.profiler.span('plot_camera_view'):
+                self.camera.redraw_camera_view(self.scene, projected_wireframe)
+        else:
+            return False
+
+        if camera_view is not None:
+            self.camera_image = camera_view['image']
+        self.__clear_dirty(frame, 'camera_view')
+        return True
+
+    def set_rig(self, rig: CameraRig):
+        # Replaces the camera rig, each camera image has the size of the main raster
+        self.rig = rig
+        self.rig_rasters = [Raster(self.raster.width, self.raster.height, self.raster.extent) for _ in rig.cameras]
+        self.rig_images = None
+        self.rig_stats = [{'frames': 0, 'seconds': 0.0, 'fps': 0.0} for _ in rig.cameras]
+        self.invalidate('camera')
+
+    def draw_camera_grid(self, frame: dict = None):
+        # Returns whether the rig cameras images have changed since they were last drawn, the images of a prepared
+        # frame are then the ones shown
+        dirty, rig_images = self.__get_frame_view(frame, 'camera_grid')
+        if not dirty:
+            return False
+
+        if rig_images is not None:
+            self.rig_images = rig_images
+        self.__clear_dirty(frame, 'camera_grid')
+        return True
+
+    def set_interactive(self, interactive: bool):
+        # The frames are drawn with a simplified mesh while interactive, the full detail one is drawn otherwise
+        self.interactive = interactive
+
+    def update_level(self):
+        # Chooses the level of detail of the next frame from the frame times measured so far, returns it.
+        # Changing it replaces the actors geometry, so it's called at the GUI thread, as the pose updates are,
+        # before the frame is prepared
+        level = 0
+        if self.interactive:
+            level = self.scene.choose_level(self.frame_times, INTERACTIVE_FRAME_BUDGET)
+        if self.scene.set_level(level):
+            self.invalidate('actor')
+        return self.scene.level
+
+    def record_frame_time(self, seconds: float, level: int = None):
+        # Updates the frame time estimate of the level drawn (the current one by default) with the time taken
+        # by the last frame
+        if level is None:
+            level = self.scene.level
+        if level in self.frame_times:
+            seconds = self.frame_times[level] + 0.3 * (seconds - self.frame_times[level])
+        self.frame_times[level] = seconds
+
+    def prepare_frame(self):
+        # Computes the data the dirty views will draw and returns it as a frame, drawn by passing it to the draw
+        # methods. The dirty components are taken by the frame, and the frame keeps the scene state (read before
+        # the data) and level it was prepared at, so finish_frame marks them again when they've changed since.
+        # Touches no plotting axis and changes no scene state, so it can run away from the GUI thread
+        with self.dirty_lock:
+            dirty = {view: set(components) for view, components in self.dirty.items()}
+            for components in self.dirty.values():
+                components.clear()
+        frame = {'dirty': dirty, 'state': self.get_frame_state(), 'level': self.scene.level}
+
+        with self.profiler.span('prepare_frame'):
+            if dirty['world']:
+                with self.profiler.span('world_wireframe'):
+                    frame['world'] = {'wireframe': self.scene.get_wireframe(), 'bounds': self.get_world_bounds()}
+            if dirty['camera_view']:
+                with self.profiler.span('project_wireframe'):
+                    projected_wireframe = self.camera.project_wireframe(self.scene)
+                with self.profiler.span('camera_image'):
+                    image = self.draw_camera_image(self.raster).copy()
+                frame['camera_view'] = {'wireframe': projected_wireframe, 'image': image}
+            if dirty['camera_grid'] and len(self.rig.cameras) > 1:
+                with self.profiler.span('rig_images'):
+                    frame['camera_grid'] = [image.copy() for image in self.draw_rig_images()]
+
+        return frame
+
+    def finish_frame(self, frame: dict):
+        # Called once the prepared frame is drawn. When the scene has changed since it was prepared, the views it
+        # drew are marked dirty again and True is returned, another frame must then be prepared
+        if frame['state'] == self.get_frame_state():
+            return False
+
+        with self.dirty_lock:
+            for view, components in frame['dirty'].items():
+                self.dirty[view] |= components
+        return any(frame['dirty'].values())
+
+    def get_frame_state(self):
+        # Versions of everything the views are drawn from, a frame prepared at another state is stale
+        camera = self.camera
+        return (
+            tuple(actor.pose_version for actor in self.scene.actors),
+            self.scene.level,
+            camera.pose_version,
+            (camera.f, camera.sx, camera.sy, camera.so, camera.ox, camera.oy),
+            self.rig,
+            tuple(rig_camera.pose_version for rig_camera in self.rig.cameras),
+            self.picked_actor,
+            self.picked_face,
+            self.scene.wireframe,
+            self.scene.feature_angle,
+        )
+
+    def get_world_bounds(self):
+        # Minimum and maximum coordinates of the world view components
+        bounds = np.array([
+            bound
+            for component in [self.world_axis, self.scene, self.camera]
+            for bound in component.get_bounds()
+        ])
+        return bounds.min(axis=0), bounds.max(axis=0)
+
+    def draw_camera_image(
+            self,
+            raster: Raster,
+            projected_vertices: np.ndarray = None,
+            visible: np.ndarray = None,
+            faces: np.ndarray = None
+    ):
+        # Rasterizes the scene seen by the camera. The actors are projected and their front faces are
+        # drawn flat shaded through the depth buffer when the projected vertices aren't given,
+        # otherwise the given triangles are drawn as a silhouette with their edges
+        raster.clear()
+        if projected_vertices is None:
+            # Only the front faces inside the camera frustum are drawn, the picked face is outlined.
+            # The instances of each mesh are clipped together, and the faces of every actor are
+            # filled together, so they're depth tested in a single pass
+            points, faces, values, picked_faces = [], [], [], []
+            points_count = 0
+            for actors in self.scene.get_instances():
+                instances = [(actor, actor.mesh) for actor in actors]
+                with self.profiler.span('clip_instances'):
+                    instances_points, instances_faces, instance_indices, face_indices = self.camera.clip_instances(
+                        instances,
+                        raster.extent,
+                        cull_back_faces=True
+                    )
+                shades = self.camera.shade_instances(instances, instance_indices, face_indices)
+                points.append(instances_points)
+                faces.append(instances_faces + points_count)
+                values.append((SHADING_RANGE[0] + (SHADING_RANGE[1] - SHADING_RANGE[0]) * shades).astype(np.uint8))
+                for index, (actor, mesh) in enumerate(instances):
+                    if actor is self.picked_actor and mesh is actor.levels.meshes[0]:
+                        picked = (instance_indices == index) & (face_indices == self.picked_face)
+                        picked_faces.append(instances_faces[picked] + points_count)
+                points_count += instances_points.shape[1]
+
+            projected_vertices = np.concatenate(points, axis=1)
+            with self.profiler.span('rasterize'):
+                raster.fill_triangles(projected_vertices, np.concatenate(faces), np.concatenate(values),
+                                      depth_test=True)
+            if picked_faces:
+                raster.draw_edges(projected_vertices, picked_faces[0], value=0)
+        else:
+            raster.fill_triangles(projected_vertices, faces, 64, visible)
+            raster.draw_edges(projected_vertices, faces, visible)
+
+        return raster.image
+
+    def draw_rig_images(self, rasters: list = None):
+        # Rasterizes the scene seen by every rig camera. The actors are moved to the world once and projected
+        # through the stacked matrices of all the cameras at once, then each camera draws its front faces
+        # flat shaded through its own depth buffer. The time of the shared passes is split among the cameras
+        rasters = rasters or self.rig_rasters
+        start_time = time.perf_counter()
+        vertices, faces, normals, plane_offsets = self.rig.get_world_mesh(self.scene)
+        projected_cameras, visible_cameras = self.rig.project(vertices)
+        shared_seconds = (time.perf_counter() - start_time) / len(rasters)
+
+        for index, raster in enumerate(rasters):
+            start_time = time.perf_counter()
+            drawn = self.rig.cull_faces(
+                index,
+                projected_cameras[index],
+                visible_cameras[index],
+                faces,
+                normals,
+                plane_offsets,
+                raster.extent
+            )
+            shades = self.rig.shade_faces(index, normals[drawn])
+            raster.clear()
+            raster.fill_triangles(
+                projected_cameras[index],
+                faces[drawn],
+                (SHADING_RANGE[0] + (SHADING_RANGE[1] - SHADING_RANGE[0]) * shades).astype(np.uint8),
+                depth_test=True
+            )
+            self.__update_rig_stats(index, shared_seconds + time.perf_counter() - start_time)
+
+        return [raster.image for raster in rasters]
+
+    def pick_camera_image(self, column: int, row: int, raster: Raster = None):
+        # Picks the face seen at the camera image pixel, of the nearest actor seen there. Returns it and
+        # the world coordinate where it's seen, or (None, None) when there's nothing there
+        image_point = (raster or self.raster).to_image_plane(column, row)
+        picked_actor, face, coordinate = None, None, None
+        distance = np.inf
+        for actor in self.scene.actors:
+            actor_face, actor_coordinate = self.camera.pick(actor, image_point)
+            if actor_face is None:
+                continue
+
+            actor_distance = np.linalg.norm(actor_coordinate - self.camera.coordinate)
+            if actor_distance < distance:
+                picked_actor, face, coordinate, distance = actor, actor_face, actor_coordinate, actor_distance
+
+        if (picked_actor, face) != (self.picked_actor, self.picked_face):
+            self.picked_actor, self.picked_face = picked_actor, face
+            self.invalidate('picked_face')
+
+        return face, coordinate
+
+    def draw_world_components(self, plot_axis, frame: dict = None):
+        # Redraws the world view, only the dirty components are updated. Given a prepared frame, the components it
+        # was prepared for are drawn from its data, otherwise the current dirty ones are drawn and cleared. The
+        # axes and the camera mesh, a few points each, are drawn at their current pose
+        dirty, world = self.__get_frame_view(frame, 'world')
+        wireframe, bounds = (None, None) if world is None else (world['wireframe'], world['bounds'])
+        if self.plot_axes['world'] is not plot_axis:
+            with self.profiler.span('plot_clear'):
+                plot_axis.clear()
+            with self.profiler.span('plot_world'):
+                self.world_axis.draw(plot_axis)
+                self.scene.draw(plot_axis, wireframe)
+                self.actor.axis.draw(plot_axis)
+                self.camera.draw(plot_axis)
+            self.plot_axes['world'] = plot_axis
+        elif dirty:
+            with self.profiler.span('plot_world'):
+                if 'actor' in dirty:
+                    self.scene.redraw(plot_axis, wireframe)
+                    self.actor.axis.redraw(plot_axis)
+                if 'camera' in dirty:
+                    self.camera.redraw(plot_axis)
+                self.__fit_world_limits(plot_axis, bounds)
+        else:
+            return False
+
+        self.__clear_dirty(frame, 'world')
+        return True
+
+    def __get_frame_view(self, frame: dict, view: str):
+        # Dirty components of the view and the data prepared for it: the frame ones, or the current dirty ones
+        # and no data without a frame
+        if frame is None:
+            with self.dirty_lock:
+                return set(self.dirty[view]), None
+        return frame['dirty'][view], frame.get(view)
 
-    def draw_world_components(self, plot_axis):
-        plot_axis.clear()
-        self.world_axis.draw(plot_axis)
-        self.actor.draw(plot_axis)
-        self.camera.draw(plot_axis)
+    def __clear_dirty(self, frame: dict, view: str):
+        # The prepared frames have taken their dirty components already
+        if frame is None:
+            with self.dirty_lock:
+                self.dirty[view].clear()
+
+    def __update_rig_stats(self, camera_index: int, seconds: float):
+        stats = self.rig_stats[camera_index]
+        stats['frames'] += 1
+        stats['seconds'] += seconds
+        stats['fps'] = stats['frames'] / max(stats['seconds'], 1e-12)
+
+    def __fit_world_limits(self, plot_axis, bounds: tuple = None):
+        # Fits the axis limits to the world components (or the given bounds), like a full redraw autoscale does
+        lower, upper = bounds or self.get_world_bounds()
+        margins = np.array(plot_axis.margins()) * (upper - lower)
+        for index, dim in enumerate('xyz'):
+            getattr(plot_axis, 'set_{}lim'.format(dim))(lower[index] - margins[index], upper[index] + margins[index])
 
     def move_object(
             self,
             object: [Actor, Camera],
             target_coordinate: np.ndarray = None,
             rotation_angle: float = None,
-            rotation_axis: str = None,
+            rotation_axis: [str, np.ndarray] = None,
             reference_axis: str = None
     ):
-        # Sets the world axis as the default reference axis
-        if reference_axis is None:
-            reference_axis = 'world'
-
-        # Sets the target point to 0, if its not declared
-        if target_coordinate is None:
-            target_coordinate = np.zeros(3)
-
-        # Gets the axis thats the movement is related to
-        if reference_axis == 'actor':
-            axis_coordinate = self.actor.axis.coordinate
-        elif reference_axis == 'camera':
-            axis_coordinate = self.camera.axis.coordinate
-        else:
-            axis_coordinate = np.zeros(3)
+        with self.profiler.span('move_object'):
+            # Sets the world axis as the default reference axis
+            if reference_axis is None:
+                reference_axis = 'world'
 
-        # Gets the reverse of the previous movement matrix
-        reverse_movement_matrix = self.get_reverse_movement_matrix(
-            movement_matrix=object.previous_movement_matrix
-        )
+            # Sets the target point to 0, if its not declared
+            if target_coordinate is None:
+                target_coordinate = np.zeros(3)
 
-        object.move(reverse_movement_matrix)
+            # Gets the axis thats the movement is related to
+            if reference_axis == 'actor':
+                axis_coordinate = self.actor.axis.coordinate
+            elif reference_axis == 'camera':
+                axis_coordinate = self.camera.axis.coordinate
+            else:
+                axis_coordinate = np.zeros(3)
 
-        # Get's the next movement matrix
-        if type(object).__name__ == reference_axis.capitalize():
-            # Rotates the object at his own axis
-            rotation_matrix = self.get_movement_matrix(
-                rotation_angle=rotation_angle,
-                rotation_axis=rotation_axis
-            )
-
-            # Moves the object according to its bases
-            translation_matrix = self.get_movement_matrix(target_point=target_coordinate)
-            movement_matrix = np.dot(translation_matrix, rotation_matrix)
-        else:
-            # Moves the object back to the reference axis
-            target_coordinate = np.dot(self.get_rotation_matrix(rotation_angle, rotation_axis), target_coordinate.T)
-            neg_translation_matrix = self.get_movement_matrix(target_point=target_coordinate-axis_coordinate)
-
-            # Rotates the object at the selected axis
-            rotation_matrix = self.get_movement_matrix(
-                rotation_angle=rotation_angle,
-                rotation_axis=rotation_axis
-            )
+            # Get's the next movement matrix, composed in place as a single matrix
+            rotation_matrix = self.get_rotation_matrix(rotation_angle, rotation_axis)
+            movement_matrix = np.eye(4)
+            movement_matrix[0:3, 0:3] = rotation_matrix
+            if object.reference_frame == reference_axis:
+                # Rotates the object at his own axis and then moves it according to its bases
+                movement_matrix[0:3, 3] = target_coordinate
+            else:
+                # Moves the object back to the reference axis, rotates it at the selected axis and
+                # then moves it to it's final position: T(axis) R T(R target - axis)
+                target_coordinate = np.dot(rotation_matrix, target_coordinate)
+                movement_matrix[0:3, 3] = axis_coordinate + np.dot(rotation_matrix, target_coordinate - axis_coordinate)
 
-            # Moves the object to it's final position
-            pos_translation_matrix = self.get_movement_matrix(target_point=axis_coordinate)
+            # Replaces the previous movement, the object geometry is only updated when it's read
+            if not np.array_equal(object.pose, movement_matrix):
+                object.set_pose(movement_matrix)
+                self.invalidate(object.reference_frame)
 
-            # Gets the new movement matrix
-            movement_matrix = np.linalg.multi_dot([
-                pos_translation_matrix,
-                rotation_matrix,
-                neg_translation_matrix
-            ])
+    def get_animation_matrices(
+            self,
+            object: [Actor, Camera],
+            target_pose: np.ndarray,
+            frames: int
+    ):
+        # (frames, 4, 4) movement matrices taking the object from its pose to the target one at a constant
+        # speed, the rotation along the shortest arc. The first and last ones are the poses themselves
+        fractions = np.linspace(0, 1, frames)
+        animation_matrices = Pose.from_matrix(object.pose).interpolate(Pose.from_matrix(target_pose), fractions)
+        animation_matrices = animation_matrices.to_matrix()
+        animation_matrices[0] = object.pose
+        animation_matrices[-1] = target_pose
 
-        object.move(movement_matrix)
+        return animation_matrices
 
     def get_movement_matrix(
             self,
             current_point: np.ndarray = np.zeros(3),
             target_point: np.ndarray = np.zeros(3),
             rotation_angle: float = 0,
-            rotation_axis: str = None,
+            rotation_axis: [str, np.ndarray] = None,
     ):
         movement_matrix = np.eye(4)
         movement_matrix[0:3, 3] = target_point - current_point
@@ -151,8 +484,17 @@ class MainController:
     def get_rotation_matrix(
             self,
             rotation_angle: float = 0,
-            rotation_axis: str = None
+            rotation_axis: [str, np.ndarray] = None
     ):
+        # The rotation axis is 'x', 'y' or 'z' (the default) or any 3D direction, rotated around by the right
+        # hand rule. The 'y' axis is rotated around the other way, as the dial has always done
+        if rotation_axis is not None and not isinstance(rotation_axis, str):
+            return Pose.from_axis_angle(rotation_axis, rotation_angle).to_matrix()[0:3, 0:3]
+
+        # The integer degree angles are read from the rotation table, which mustn't be changed in place
+        if rotation_angle is not None and float(rotation_angle).is_integer() and 0 <= rotation_angle <= 360:
+            return ROTATION_TABLE[rotation_axis if rotation_axis in ('x', 'y') else 'z'][int(rotation_angle)]
+
         # Generates the new movement matrix according to the params given
         if rotation_angle is not None:
             rotation_angle = self.__degrees_to_radians(rotation_angle)
@@ -0,0 +1,327 @@
+import os
+import time
+from collections import deque
+
+import numpy as np
+
+from controllers.MainController import MainController
+from models.Actor import Actor
+from models.Camera import Camera
+from models.CameraRig import CameraRig
+from models.Projector import Projector
+from models.Raster import Raster
+from models.Trajectory import Trajectory
+
+# Bytes each chunk of trajectory frames is projected in, at most (a chunk has at least one frame)
+CHUNK_BYTES = 2 ** 26
+
+# Bytes of the shared buffer the process pool workers write their expanded frames to, at most (it holds at least
+# two frames)
+PARALLEL_BUFFER_BYTES = 2 ** 28
+
+
+class RenderController(MainController):
+    def __init__(
+            self,
+            actor: Actor,
+            camera: Camera,
+            width: int = 640,
+            height: int = 640,
+            extent: float = 10
+    ):
+        super().__init__(actor=actor, camera=camera)
+        self.raster = Raster(width=width, height=height, extent=extent)
+        self.set_rig(self.rig)
+        self.trajectory_stats = {'frames': 0, 'seconds': 0.0, 'fps': 0.0}
+
+    def set_pose(
+            self,
+            actor_pose: dict = None,
+            camera_pose: dict = None,
+            camera_params: dict = None
+    ):
+        # Applies the poses and intrinsic parameters, the omitted ones are kept as they are
+        if actor_pose is not None:
+            self.move_actor(**self.__parse_pose(actor_pose))
+        if camera_pose is not None:
+            self.move_camera(**self.__parse_pose(camera_pose))
+        if camera_params is not None:
+            self.update_camera_params(**camera_params)
+
+    def render_points(
+            self,
+            actor_pose: dict = None,
+            camera_pose: dict = None,
+            camera_params: dict = None
+    ):
+        # Returns the 2xN projected actor coordinates and the mask of the visible ones
+        self.set_pose(actor_pose, camera_pose, camera_params)
+        projected_actor, visible = self.camera.project(self.actor)
+
+        return projected_actor[0:2, :], visible
+
+    def render_image(
+            self,
+            actor_pose: dict = None,
+            camera_pose: dict = None,
+            camera_params: dict = None
+    ):
+        # Returns the camera view rasterized at an image buffer
+        self.set_pose(actor_pose, camera_pose, camera_params)
+        return self.draw_camera_image(self.raster).copy()
+
+    def set_rig_cameras(self, cameras: list):
+        # Replaces the camera rig by the cameras described by each entry optional "camera" pose
+        # and "camera_params", as the set_pose arguments
+        rig_cameras = []
+        for entry in cameras:
+            camera = Camera(**entry.get('camera_params', {}))
+            if entry.get('camera') is not None:
+                self.move_object(camera, **self.__parse_pose(entry['camera']))
+            rig_cameras.append(camera)
+
+        self.set_rig(CameraRig(rig_cameras))
+
+    def render_rig_images(self, actor_pose: dict = None):
+        # Returns the image of every rig camera, rendered in a single pass
+        self.set_pose(actor_pose)
+        return [image.copy() for image in self.draw_rig_images()]
+
+    def render_trajectory(
+            self,
+            trajectory: Trajectory,
+            chunk_bytes: int = CHUNK_BYTES
+    ):
+        # Streams the 2xN projected actor coordinates and visibility mask of every trajectory frame.
+        # The frames are projected in chunks of about the bytes, through stacked world to image matrices
+        return self.__time_frames(self.__project_trajectory(trajectory, chunk_bytes))
+
+    def render_trajectory_parallel(
+            self,
+            trajectory: Trajectory,
+            workers: int = None,
+            buffer_bytes: int = PARALLEL_BUFFER_BYTES
+    ):
+        # Same as render_trajectory, but the frames chunks are projected and expanded along the mesh by a process
+        # pool, straight into a shared buffer of about the bytes. The memory used is bounded by it, whatever the
+        # trajectory length and the workers count. The frames are read only views of the buffer, they aren't
+        # copied, so each one is only valid until the next one is requested: the frames kept must be copied
+        return self.__time_frames(self.__project_trajectory_parallel(trajectory, workers, buffer_bytes))
+
+    def get_projection_matrices(
+            self,
+            trajectory: Trajectory,
+            frames: slice = slice(None)
+    ):
+        # Composes the (F, 3, 4) matrices that take the actor model points to the camera image plane
+        actor_matrices = trajectory.actor_matrices[frames]
+        camera_matrices = trajectory.camera_matrices[frames]
+
+        # Moves the camera from its model space position to each frame pose
+        camera_coordinate = np.ones(4)
+        camera_coordinate[0:3] = self.camera.model_coordinate
+        camera_coordinates = np.dot(camera_matrices, camera_coordinate)[:, 0:3]
+
+        # Changes from the world to the camera reference frame, like Projector.to_camera_coordinates
+        camera_bases = camera_matrices[:, 0:3, 0:3]
+        extrinsic_matrices = np.zeros([camera_matrices.shape[0], 3, 4])
+        extrinsic_matrices[:, :, 0:3] = camera_bases
+        extrinsic_matrices[:, :, 3] = -np.matmul(camera_bases, camera_coordinates[:, :, np.newaxis])[:, :, 0]
+
+        return np.matmul(
+            self.__get_intrinsic_parameter_matrices(trajectory, frames, camera_matrices.shape[0]),
+            np.matmul(extrinsic_matrices, actor_matrices)
+        )
+
+    def __project_trajectory_parallel(self, trajectory: Trajectory, workers: int, buffer_bytes: int):
+        # The actor mesh is shared with the workers, read only, and each chunk is written to a slot of the shared
+        # frames buffer, so only the projection matrices and the frames count cross the process boundary. A slot
+        # is reused once the caller has moved past its frames. The process pool is imported here, so the serial
+        # renderers don't load it at startup
+        from concurrent.futures import ProcessPoolExecutor
+
+        mesh = self.actor.mesh
+        dtype = Projector.get_dtype(mesh.vertices)
+        indices_count = mesh.indices.size
+        workers = workers or os.cpu_count()
+
+        # Two slots per worker keep them busy while the frames of a slot are read, fewer when the frames are so
+        # large that the buffer only holds a few of them
+        frame_bytes = indices_count * (2 * dtype.itemsize + 1)
+        slots_count = max(2, min(2 * workers, buffer_bytes // frame_bytes))
+        slot_frames = max(1, buffer_bytes // (slots_count * frame_bytes))
+
+        mesh_buffer = _SharedArrays([
+            (mesh.vertices.T.shape, mesh.vertices.dtype),
+            (mesh.indices.shape, mesh.indices.dtype),
+        ])
+        frames_buffer = _SharedArrays([
+            ((slots_count, slot_frames, 2, indices_count), dtype),
+            ((slots_count, slot_frames, indices_count), bool),
+        ])
+        try:
+            mesh_buffer.arrays[0][:] = mesh.vertices.T
+            mesh_buffer.arrays[1][:] = mesh.indices
+
+            with ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_attach_shared_arrays,
+                    initargs=(mesh_buffer.get_layout(), frames_buffer.get_layout(), self.camera.projector.near)
+            ) as executor:
+                # The chunks are collected in the frames order, a slot is freed when the frame after its last one
+                # is requested
+                in_flight = deque()
+                free_slots = list(range(slots_count))
+                for first_frame in range(0, len(trajectory), slot_frames):
+                    if not free_slots:
+                        slot, future = in_flight.popleft()
+                        yield from self.__read_slot(frames_buffer, slot, future.result())
+                        free_slots.append(slot)
+
+                    slot = free_slots.pop()
+                    frames = slice(first_frame, first_frame + slot_frames)
+                    in_flight.append((slot, executor.submit(
+                        _project_shared_mesh,
+                        self.get_projection_matrices(trajectory, frames),
+                        slot
+                    )))
+
+                while in_flight:
+                    slot, future = in_flight.popleft()
+                    yield from self.__read_slot(frames_buffer, slot, future.result())
+        finally:
+            mesh_buffer.release()
+            frames_buffer.release()
+
+    @staticmethod
+    def __read_slot(frames_buffer: '_SharedArrays', slot: int, frames_count: int):
+        # Read only views of the slot frames, the slot is written again after the last one
+        for frame in range(frames_count):
+            projected_actor = frames_buffer.arrays[0][slot, frame]
+            visible = frames_buffer.arrays[1][slot, frame]
+            projected_actor.flags.writeable = False
+            visible.flags.writeable = False
+            yield projected_actor, visible
+
+    def __project_trajectory(self, trajectory: Trajectory, chunk_bytes: int):
+        # Each frame projects the mesh vertices as (3, N) points and their visibility
+        actor_model_vertices = self.actor.mesh.vertices.T
+        frame_bytes = actor_model_vertices.shape[1] * (3 * Projector.get_dtype(actor_model_vertices).itemsize + 1)
+        chunk_frames = max(1, chunk_bytes // frame_bytes)
+        for first_frame in range(0, len(trajectory), chunk_frames):
+            frames = slice(first_frame, first_frame + chunk_frames)
+            projected_frames, visible_frames = self.camera.projector.project_frames(
+                self.get_projection_matrices(trajectory, frames),
+                actor_model_vertices
+            )
+            yield from self.__expand_frames(projected_frames, visible_frames)
+
+    def __get_intrinsic_parameter_matrices(self, trajectory: Trajectory, frames: slice, frames_count: int):
+        if trajectory.camera_params is None:
+            return np.broadcast_to(self.camera.get_intrinsic_parameter_matrix(), [frames_count, 3, 3])
+
+        # Built from the frames parameters, the controller camera keeps its own
+        return Camera.get_intrinsic_parameter_matrices(trajectory.camera_params[frames])
+
+    def __expand_frames(self, projected_frames: np.ndarray, visible_frames: np.ndarray):
+        # Repeats the projected vertices along the actor mesh
+        mesh_indices = self.actor.mesh.indices
+        for projected_vertices, visible in zip(projected_frames, visible_frames):
+            yield projected_vertices[0:2, mesh_indices], visible[mesh_indices]
+
+    def __time_frames(self, frames):
+        # Streams the frames, timing all the work producing each one (projection and expansion alike) but not the
+        # caller's between them, so the serial and parallel renderers report comparable rates
+        self.trajectory_stats = {'frames': 0, 'seconds': 0.0, 'fps': 0.0}
+        try:
+            while True:
+                start_time = time.perf_counter()
+                frame = next(frames, None)
+                if frame is None:
+                    return
+                self.__update_trajectory_stats(1, time.perf_counter() - start_time)
+                yield frame
+        finally:
+            # Releases the projection resources (like the process pool) when the caller stops early
+            frames.close()
+
+    def __update_trajectory_stats(self, frames: int, seconds: float):
+        self.trajectory_stats['frames'] += frames
+        self.trajectory_stats['seconds'] += seconds
+        self.trajectory_stats['fps'] = self.trajectory_stats['frames'] / max(self.trajectory_stats['seconds'], 1e-12)
+
+    def __parse_pose(self, pose: dict):
+        # Converts a serialized pose to the move_object arguments
+        pose = dict(pose)
+        pose.setdefault('rotation_angle', 0)
+        if pose.get('target_coordinate') is not None:
+            pose['target_coordinate'] = np.array(pose['target_coordinate'], dtype=float)
+        if isinstance(pose.get('rotation_axis'), list):
+            pose['rotation_axis'] = np.array(pose['rotation_axis'], dtype=float)
+        return pose
+
+
+class _SharedArrays:
+    def __init__(self, specs: list, name: str = None):
+        # Arrays of the (shape, dtype) specs laid out one after the other at a shared memory block, created when
+        # no name is given, otherwise attached by name from another process
+        from multiprocessing import shared_memory
+
+        self.specs = [(tuple(shape), np.dtype(dtype)) for shape, dtype in specs]
+        offsets = [0]
+        for shape, dtype in self.specs:
+            # Each array starts at a cache line
+            array_bytes = int(np.prod(shape)) * dtype.itemsize
+            offsets.append(offsets[-1] + (array_bytes + 63) // 64 * 64)
+        self.created = name is None
+        self.shared_memory = shared_memory.SharedMemory(name=name, create=self.created, size=max(offsets[-1], 1))
+
+        # The arrays are laid at the block address instead of exporting its buffer, and each one (and every view
+        # of it) keeps this object alive. So the block is unmapped once the last of them is collected, even after
+        # being released while the caller still holds a view, and never while one is still read
+        address = np.frombuffer(self.shared_memory.buf, dtype=np.uint8).ctypes.data
+        self.arrays = [
+            np.asarray(_SharedArray(self, address + offset, shape, dtype))
+            for (shape, dtype), offset in zip(self.specs, offsets)
+        ]
+
+    def get_layout(self):
+        # Name and specs another process attaches the arrays with
+        return self.shared_memory.name, [(shape, dtype.str) for shape, dtype in self.specs]
+
+    def release(self):
+        # Removes the block when it was created here, its memory is freed once every process has unmapped it
+        self.arrays = []
+        if self.created:
+            self.shared_memory.unlink()
+
+
+class _SharedArray:
+    def __init__(self, shared_arrays: _SharedArrays, address: int, shape: tuple, dtype: np.dtype):
+        # Array interface of a shared block array, its arrays keep the block mapped
+        self.shared_arrays = shared_arrays
+        self.__array_interface__ = {'version': 3, 'data': (address, False), 'shape': shape, 'typestr': dtype.str}
+
+
+# Process pool workers state, the shared actor mesh and frames buffer are attached once per worker
+_worker_state = {}
+
+
+def _attach_shared_arrays(mesh_layout: tuple, frames_layout: tuple, near: float):
+    mesh_name, mesh_specs = mesh_layout
+    frames_name, frames_specs = frames_layout
+    _worker_state['mesh'] = _SharedArrays(mesh_specs, mesh_name)
+    _worker_state['frames'] = _SharedArrays(frames_specs, frames_name)
+    _worker_state['mesh'].arrays[0].flags.writeable = False
+    _worker_state['projector'] = Projector(near=near)
+
+
+def _project_shared_mesh(projection_matrices: np.ndarray, slot: int):
+    # Projects the chunk frames and writes them, expanded along the mesh, to the slot. Returns the frames count
+    vertices, indices = _worker_state['mesh'].arrays
+    projected_slots, visible_slots = _worker_state['frames'].arrays
+    projected_frames, visible_frames = _worker_state['projector'].project_frames(projection_matrices, vertices)
+    for frame, (projected_vertices, visible) in enumerate(zip(projected_frames, visible_frames)):
+        np.take(projected_vertices[0:2], indices, axis=1, out=projected_slots[slot, frame])
+        np.take(visible, indices, out=visible_slots[slot, frame])
+    return projected_frames.shape[0]
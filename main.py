@@ -1,30 +1,102 @@
+import argparse
+import os
 import sys
 
+import numpy as np
 from PyQt5.QtWidgets import QApplication
 from controllers.MainController import MainController
-from models.Actor import Actor
 from models.Camera import Camera
-from views.main.MainView import MainView
+from models.CameraRig import CameraRig
+from models.FrameExporter import FrameExporter, VIDEO_CODECS
+from models.Scene import Scene
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Shows the camera view of a scene of actors.')
+    parser.add_argument('mesh_paths', nargs='*', metavar='mesh_path',
+                        help='STL file of each actor, the bundled link mesh is used when none is given')
+    parser.add_argument('--instances', type=int, default=1, help='actors added for each mesh, all of them share it')
+    parser.add_argument('--cameras', type=int, default=1, help='cameras of the rig shown at the camera grid')
+    parser.add_argument('--baseline', type=float, default=20,
+                        help='distance along the world x axis between the rig cameras')
+    parser.add_argument('--precision', choices=['float64', 'float32'], default='float64',
+                        help='floating point type the meshes are loaded, moved and projected at')
+    parser.add_argument('--wireframe', choices=['polyline', 'edges'], default='polyline',
+                        help='draws the triangles one after the other or each unique mesh edge once')
+    parser.add_argument('--feature-angle', type=float,
+                        help='draws only the edges whose faces meet at this angle (in degrees) or more, '
+                             'as --wireframe edges')
+    parser.add_argument('--profile', action='store_true',
+                        help='shows the frame stages times overlay from the start, F3 toggles it')
+    parser.add_argument('--trace', help='Chrome trace JSON file the frame stages spans are written to at exit')
+    parser.add_argument('--record', help='video file ({}) or directory of images the camera image is written to '
+                                         'each time it changes'.format(', '.join(VIDEO_CODECS)))
+    return parser.parse_args(argv)
 
 
 class App(QApplication):
     def __init__(self, sys_argv):
+        # The arguments are parsed before the application is created, so --help and a wrong argument exit
+        # without starting Qt
+        args = parse_args(sys_argv[1:])
         super().__init__(sys_argv)
 
-        # Setup Actors
+        # Uses the meshes given at the command line or the bundled link mesh
+        self.trace_path = args.trace
+        mesh_paths = args.mesh_paths or [
+            os.path.join(os.path.dirname(os.path.abspath(__file__)), 'public', 'stl', 'link.STL')
+        ]
+
+        # Setup Actors, the instances of a mesh are laid out next to each other
         camera = Camera()
-        actor = Actor(mesh_path='/home/alaf/Downloads/VisaoComp1-master/public/stl/link.STL')
+        scene = Scene(dtype=np.dtype(args.precision).type)
+        scene.wireframe = 'edges' if args.feature_angle is not None else args.wireframe
+        scene.feature_angle = args.feature_angle
+        for mesh_path in mesh_paths:
+            for _ in range(args.instances):
+                scene.add_actor(mesh_path=mesh_path)
+        if len(scene.actors) > 1:
+            scene.arrange()
 
-        # Setup Controllers
+        # Setup Controllers, the controls move the first actor and the first camera
+        rig = CameraRig([camera] + [Camera(f=5) for _ in range(args.cameras - 1)])
         main_controller = MainController(
-            actor=actor,
-            camera=camera
+            actor=scene.actors[0],
+            camera=camera,
+            scene=scene,
+            rig=rig
         )
+        main_controller.profiler.enabled = args.trace is not None
 
-        # Setup Views
+        # The other rig cameras start at the first camera initial pose, set by the main view controls,
+        # side by side along the world x axis
+        for index, rig_camera in enumerate(rig.cameras[1:], start=1):
+            main_controller.move_object(
+                rig_camera,
+                target_coordinate=np.array([index * args.baseline, 50, -50]),
+                rotation_angle=90,
+                rotation_axis='x',
+                reference_axis='world'
+            )
+
+        # Setup Views. The view is imported once the application exists, so matplotlib is only loaded by the GUI
+        # and finds the Qt binding already imported
+        from views.main.MainView import MainView
         self.main_view = MainView(controller=main_controller)
+        self.main_view.setProfileOverlayVisible(args.profile)
+        if args.record is not None:
+            self.main_view.frame_exporter = FrameExporter(args.record)
         self.main_view.show()
 
+    def exec_(self):
+        # Writes the trace of the whole session and the last recorded frames once the window is closed
+        exit_code = super().exec_()
+        if self.main_view.frame_exporter is not None:
+            self.main_view.frame_exporter.close()
+        if self.trace_path is not None:
+            self.main_view.controller.profiler.export_trace(self.trace_path)
+        return exit_code
+
 
 if __name__ == '__main__':
     app = App(sys.argv)
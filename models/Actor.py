@@ -1,7 +1,6 @@
 import numpy as np
-from mpl_toolkits.mplot3d import art3d
-from stl import mesh
 
+from models.LevelOfDetail import LevelOfDetail
 from models.Object import Object
 
 
@@ -10,21 +9,53 @@ class Actor(Object):
             self,
             mesh_path: str,
             coordinate: np.ndarray = None,
+            levels: LevelOfDetail = None,
+            dtype: type = float
     ):
-        # Obtains the actor mesh vectors and points
-        object_mesh = mesh.Mesh.from_file(mesh_path)
-        x = object_mesh.x.flatten()
-        y = object_mesh.y.flatten()
-        z = object_mesh.z.flatten()
-        self.mesh_vectors = object_mesh.vectors
-        self.mesh_matrix = np.array([x.T, y.T, z.T, np.ones(x.size)])
+        # Loads the actor mesh and its simplified versions at the precision, unless they're given already
+        # loaded, as the actors of a scene drawing the same mesh share them. The drawn mesh is replaced as
+        # a whole when the level changes, so it's read once by each computation using it
+        self.mesh_path = mesh_path
+        self.levels = levels or LevelOfDetail.from_file(mesh_path, dtype)
+        self.level = 0
+        self.mesh = self.levels.meshes[0]
+
+        self.mesh_line = None
 
         # Init object
-        super().__init__(coordinate=coordinate)
+        super().__init__(coordinate=coordinate, reference_frame='actor')
+
+    @property
+    def vertices(self):
+        # (N, 3) world space vertices, cached until the actor pose changes
+        return self.get_cached('vertices', lambda pose: self.to_world(self.mesh.vertices, pose))
+
+    @property
+    def mesh_vectors(self):
+        # (F, 3, 3) coordinates of each triangle vertices
+        mesh = self.mesh
+        return self.to_world(mesh.vertices, self.pose)[mesh.faces]
+
+    @property
+    def mesh_matrix(self):
+        # Homogeneous 4xN world coordinates of every triangle vertex, only built when it's read
+        return self.get_cached('mesh_matrix', self.__get_mesh_matrix)
+
+    def set_level(self, level: int):
+        # Draws the mesh at the level of detail (0 is the full detail), or at its most simplified one when
+        # it has fewer levels. Returns whether it has changed
+        level = min(level, len(self.levels.meshes) - 1)
+        if level == self.level:
+            return False
+
+        self.level = level
+        self.mesh = self.levels.meshes[level]
+        self.invalidate()
+        return True
 
     def draw(self, plot_axis):
         # Draws the actor mesh surfaces and lines
-        plot_axis.plot(self.mesh_matrix[0, :], self.mesh_matrix[1, :], self.mesh_matrix[2, :], 'b')
+        self.mesh_line, = plot_axis.plot(self.mesh_matrix[0, :], self.mesh_matrix[1, :], self.mesh_matrix[2, :], 'b')
         # plot_axis.add_collection3d(art3d.Poly3DCollection(self.mesh_vectors))
         # plot_axis.add_collection3d(art3d.Line3DCollection(
         #     self.mesh_vectors,
@@ -36,12 +67,30 @@ class Actor(Object):
         # Draws the object axis
         super().draw(plot_axis)
 
-    def move(
-            self,
-            movement_matrix: np.ndarray = None,
-    ):
-        # Updates the actor mesh matrix
-        self.mesh_matrix = np.dot(movement_matrix, self.mesh_matrix)
+    def redraw(self, plot_axis):
+        # Moves the drawn actor mesh in place
+        self.mesh_line.set_data_3d(self.mesh_matrix[0, :], self.mesh_matrix[1, :], self.mesh_matrix[2, :])
+
+        # Updates the object axis
+        super().redraw(plot_axis)
+
+    def get_bounds(self):
+        # The actor axis bounds an actor whose mesh has no vertices
+        axis_min, axis_max = super().get_bounds()
+        vertices_bounds = self.get_cached('bounds', self.__get_vertices_bounds)
+        if vertices_bounds is None:
+            return axis_min, axis_max
+        vertices_min, vertices_max = vertices_bounds
+        return np.minimum(axis_min, vertices_min), np.maximum(axis_max, vertices_max)
+
+    def __get_mesh_matrix(self, pose: np.ndarray):
+        mesh = self.mesh
+        mesh_matrix = np.ones([4, mesh.indices.size], dtype=mesh.vertices.dtype)
+        mesh_matrix[0:3, :] = self.to_world(mesh.vertices, pose)[mesh.indices].T
+        return mesh_matrix
 
-        # Updates the actor axis coordinates
-        super().move(movement_matrix=movement_matrix)
+    def __get_vertices_bounds(self, pose: np.ndarray):
+        if self.mesh.vertices.shape[0] == 0:
+            return None
+        vertices = self.to_world(self.mesh.vertices, pose)
+        return vertices.min(axis=0), vertices.max(axis=0)
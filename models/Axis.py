@@ -16,40 +16,31 @@ class Axis:
         self.base = base
         self.length = length
         self.coordinate = coordinate
+        self.quivers = []
 
     def draw(self, plot_axis):
-        plot_axis.quiver(
-            self.coordinate[0],
-            self.coordinate[1],
-            self.coordinate[2],
-            self.base[0][0],
-            self.base[0][1],
-            self.base[0][2],
-            color='red',
-            pivot='tail',
-            length=self.length
-        )
+        # Draws one arrow for each of the base vectors
+        self.quivers = []
+        for index, color in enumerate(['red', 'green', 'blue']):
+            self.quivers.append(plot_axis.quiver(
+                self.coordinate[0],
+                self.coordinate[1],
+                self.coordinate[2],
+                self.base[index][0],
+                self.base[index][1],
+                self.base[index][2],
+                color=color,
+                pivot='tail',
+                length=self.length
+            ))
 
-        plot_axis.quiver(
-            self.coordinate[0],
-            self.coordinate[1],
-            self.coordinate[2],
-            self.base[1][0],
-            self.base[1][1],
-            self.base[1][2],
-            color='green',
-            pivot='tail',
-            length=self.length
-        )
+    def redraw(self, plot_axis):
+        # The quivers arrows can't be moved, so only these three artists are replaced
+        for quiver in self.quivers:
+            quiver.remove()
+        self.draw(plot_axis)
 
-        plot_axis.quiver(
-            self.coordinate[0],
-            self.coordinate[1],
-            self.coordinate[2],
-            self.base[2][0],
-            self.base[2][1],
-            self.base[2][2],
-            color='blue',
-            pivot='tail',
-            length=self.length
-        )
+    def get_bounds(self):
+        # Minimum and maximum coordinates reached by the axis arrows
+        points = np.vstack([self.coordinate, self.coordinate + self.length * np.asarray(self.base)])
+        return points.min(axis=0), points.max(axis=0)
@@ -0,0 +1,157 @@
+import numpy as np
+
+# Faces kept at each leaf of the hierarchy
+LEAF_SIZE = 32
+
+# Bits of each axis at the Morton code of the faces centroids, up to 10 fit the 32 bits codes
+MORTON_BITS = 10
+
+
+class Bvh:
+    def __init__(
+            self,
+            face_order: np.ndarray,
+            lower: np.ndarray,
+            upper: np.ndarray,
+            leaf_size: int = LEAF_SIZE
+    ):
+        # Bounding volume hierarchy over the faces of a mesh, in model space. The faces are sorted by the
+        # Morton code of their centroids and the tree is a complete binary tree stored as a heap: the node
+        # i children are 2i + 1 and 2i + 2, and every node holds a contiguous range of the sorted faces.
+        # The (M, 3) lower and upper node bounds are empty (lower > upper) for the padding leaves
+        self.face_order = face_order
+        self.lower = lower
+        self.upper = upper
+        self.leaf_size = leaf_size
+        self.depth = int(np.log2(lower.shape[0] + 1)) - 1
+
+    @classmethod
+    def build(cls, vertices: np.ndarray, faces: np.ndarray, leaf_size: int = LEAF_SIZE):
+        # Builds the hierarchy of the (F, 3) faces indexing the (N, 3) vertices
+
+        # The bounds are kept in single precision, as the STL vertices are
+        corners = vertices.astype(np.float32)[faces]
+        faces_lower = np.minimum(np.minimum(corners[:, 0], corners[:, 1]), corners[:, 2])
+        faces_upper = np.maximum(np.maximum(corners[:, 0], corners[:, 1]), corners[:, 2])
+        del corners
+
+        # Sorts the faces along a Z-order curve, so the faces near each other share the nodes
+        face_order = np.argsort(cls.get_morton_codes(faces_lower + faces_upper), kind='stable')
+        faces_lower, faces_upper = faces_lower[face_order], faces_upper[face_order]
+
+        # Bounds of the leaves, padded to a power of two with empty ones
+        leaves_count = max(-(-faces.shape[0] // leaf_size), 1)
+        depth = int(np.ceil(np.log2(leaves_count)))
+        leaves_lower = np.full([2 ** depth, 3], np.inf, dtype=np.float32)
+        leaves_upper = np.full([2 ** depth, 3], -np.inf, dtype=np.float32)
+        if faces.shape[0]:
+            leaf_starts = np.arange(0, faces.shape[0], leaf_size)
+            leaves_lower[0:leaf_starts.size] = np.minimum.reduceat(faces_lower, leaf_starts)
+            leaves_upper[0:leaf_starts.size] = np.maximum.reduceat(faces_upper, leaf_starts)
+
+        # Each level bounds join the pairs of nodes of the level below
+        levels = [(leaves_lower, leaves_upper)]
+        for _ in range(depth):
+            level_lower, level_upper = levels[0]
+            levels.insert(0, (
+                np.minimum(level_lower[0::2], level_lower[1::2]),
+                np.maximum(level_upper[0::2], level_upper[1::2])
+            ))
+
+        return cls(
+            face_order.astype(faces.dtype),
+            np.concatenate([level_lower for level_lower, _ in levels]),
+            np.concatenate([level_upper for _, level_upper in levels]),
+            leaf_size
+        )
+
+    @staticmethod
+    def get_morton_codes(points: np.ndarray):
+        # Interleaves the bits of the (N, 3) points, quantized at their bounds, into Z-order curve codes
+        if points.shape[0] == 0:
+            return np.zeros(0, dtype=np.uint32)
+        lower, upper = points.min(axis=0), points.max(axis=0)
+        scale = (2 ** MORTON_BITS - 1) / np.where(upper > lower, upper - lower, 1)
+        quantized = ((points - lower) * scale).astype(np.uint32)
+
+        # Spreads the bits of each coordinate two bits apart
+        for shift, mask in [(16, 0x030000FF), (8, 0x0300F00F), (4, 0x030C30C3), (2, 0x09249249)]:
+            quantized = (quantized | (quantized << np.uint32(shift))) & np.uint32(mask)
+        return quantized[:, 0] | (quantized[:, 1] << np.uint32(1)) | (quantized[:, 2] << np.uint32(2))
+
+    def cull(self, planes: np.ndarray):
+        # Indices of the faces at the nodes not fully outside any of the (K, 4) planes, the points p
+        # inside a plane have plane[0:3] . p + plane[3] >= 0. The nodes fully inside every plane
+        # aren't tested any further
+        normals, offsets = planes[:, 0:3], planes[:, 3]
+        accepted = []
+        nodes = np.zeros(1, dtype=np.int64)
+        for level in range(self.depth + 1):
+            lower, upper = self.lower[nodes], self.upper[nodes]
+            with np.errstate(invalid='ignore'):
+                centers = np.dot((lower + upper) / 2, normals.T) + offsets
+                radii = np.dot((upper - lower) / 2, np.abs(normals).T)
+
+            outside = np.any(centers + radii < 0, axis=1) | np.any(lower > upper, axis=1)
+            inside = np.all(centers - radii >= 0, axis=1)
+            if level == self.depth:
+                inside = ~outside
+            accepted.append(nodes[inside & ~outside])
+
+            partial = nodes[~inside & ~outside]
+            nodes = np.stack([2 * partial + 1, 2 * partial + 2], axis=1).ravel()
+
+        return self.face_order[self.get_node_faces(np.concatenate(accepted))]
+
+    def intersect_ray(self, vertices: np.ndarray, faces: np.ndarray, origin: np.ndarray, direction: np.ndarray):
+        # Nearest face hit by the ray (in model space) and the ray parameter t at the hit,
+        # (None, inf) when no face is hit. Only the faces at the leaves the ray crosses are tested
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inverse_direction = 1 / direction
+        nodes = np.zeros(1, dtype=np.int64)
+        for _ in range(self.depth):
+            nodes = nodes[self.__hit_nodes(nodes, origin, inverse_direction)]
+            nodes = np.stack([2 * nodes + 1, 2 * nodes + 2], axis=1).ravel()
+        nodes = nodes[self.__hit_nodes(nodes, origin, inverse_direction)]
+
+        # Moller-Trumbore intersection with every candidate face
+        candidates = self.face_order[self.get_node_faces(nodes)]
+        corners = vertices[faces[candidates]]
+        edge_1 = corners[:, 1] - corners[:, 0]
+        edge_2 = corners[:, 2] - corners[:, 0]
+        p = np.cross(direction, edge_2)
+        determinant = np.einsum('ij,ij->i', edge_1, p)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            inverse_determinant = 1 / determinant
+            s = origin - corners[:, 0]
+            u = np.einsum('ij,ij->i', s, p) * inverse_determinant
+            q = np.cross(s, edge_1)
+            v = np.dot(q, direction) * inverse_determinant
+            t = np.einsum('ij,ij->i', edge_2, q) * inverse_determinant
+
+        hit = (determinant != 0) & (u >= 0) & (v >= 0) & (u + v <= 1) & (t > 0)
+        if not np.any(hit):
+            return None, np.inf
+
+        nearest = np.argmin(np.where(hit, t, np.inf))
+        return int(candidates[nearest]), float(t[nearest])
+
+    def get_node_faces(self, nodes: np.ndarray):
+        # Positions at the sorted faces of the faces held by the nodes
+        levels = np.floor(np.log2(nodes + 1)).astype(np.int64)
+        leaves_per_node = 2 ** (self.depth - levels)
+        first_leaves = (nodes - (2 ** levels - 1)) * leaves_per_node
+
+        faces_count = self.face_order.size
+        starts = np.minimum(first_leaves * self.leaf_size, faces_count)
+        counts = np.minimum((first_leaves + leaves_per_node) * self.leaf_size, faces_count) - starts
+        return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+
+    def __hit_nodes(self, nodes: np.ndarray, origin: np.ndarray, inverse_direction: np.ndarray):
+        # Slab test of the ray against the nodes bounds
+        with np.errstate(invalid='ignore'):
+            t_lower = (self.lower[nodes] - origin) * inverse_direction
+            t_upper = (self.upper[nodes] - origin) * inverse_direction
+            t_near = np.nanmax(np.minimum(t_lower, t_upper), axis=1)
+            t_far = np.nanmin(np.maximum(t_lower, t_upper), axis=1)
+        return (t_far >= np.maximum(t_near, 0)) & np.all(self.lower[nodes] <= self.upper[nodes], axis=1)
@@ -1,6 +1,14 @@
+import weakref
+
 import numpy as np
 from models.Actor import Actor
+from models.Mesh import Mesh
 from models.Object import Object
+from models.Scene import Scene
+from models.Projector import Projector, NEAR
+
+# Half size of the image plane window shown by the camera view
+VIEW_EXTENT = 10
 
 
 class Camera(Object):
@@ -21,9 +29,10 @@ class Camera(Object):
         self.so = so
         self.ox = ox
         self.oy = oy
+        self.projector = Projector()
 
-        # Adds the camera mesh
-        self.mesh_matrix = np.array([
+        # Adds the camera model space mesh
+        self.model_mesh_matrix = np.array([
             [-5, -5, 0, 1],
             [-5, 5, 0, 1],
             [-5, 5, 5, 1],
@@ -40,58 +49,464 @@ class Camera(Object):
             [5, 5, 5, 1],
             [5, -5, 5, 1],
             [-5, -5, 5, 1],
-        ]).T
+        ], dtype=float).T
+        self.mesh_line = None
+        self.view_line = None
+        self.__projection = (None, None)
+        self.__polyline = (None, None)
+        self.__edges = (None, None)
 
-        super().__init__(coordinate)
+        # Matrices cached until the intrinsic parameters or the camera (or actor) pose change, they're
+        # shared by every caller, so they're read only
+        self.__intrinsic_parameter_matrix = (None, None)
+        self.__projection_matrix = (None, None)
+        self.__model_views = weakref.WeakKeyDictionary()
 
-    def move(
-            self,
-            movement_matrix: np.ndarray
-    ):
-        # Moves the camera mesh
-        self.mesh_matrix = np.dot(movement_matrix, self.mesh_matrix)
+        super().__init__(coordinate, reference_frame='camera')
 
-        # Moves the actor axis
-        super().move(movement_matrix)
+    @property
+    def mesh_matrix(self):
+        # Camera mesh at the world, cached until the camera pose changes
+        return self.get_cached('mesh_matrix', lambda pose: np.dot(pose, self.model_mesh_matrix))
 
     def draw(self, plot_axis):
         # Updates the camera mesh matrix
-        plot_axis.plot(self.mesh_matrix[0, :], self.mesh_matrix[1, :], self.mesh_matrix[2, :], 'b')
+        self.mesh_line, = plot_axis.plot(self.mesh_matrix[0, :], self.mesh_matrix[1, :], self.mesh_matrix[2, :], 'b')
 
         # Draws the camera axis
         super().draw(plot_axis)
 
-    def get_camera_view(self, plot_axis, actor: Actor):
-        # Plotting the 2D image projection from the camera point of view
-        intrinsic_parameter_matrix = self.get_intrinsic_parameter_matrix()
-        projection_matrix = np.zeros([3, 4])
-        projection_matrix[0:3, 0:3] = np.eye(3)
-
-        # Projects the actor at a 2D plane
-        projected_actor = np.zeros([3, actor.mesh_matrix.shape[1]])
-        for index in range(projected_actor.shape[1]):
-            point_coordinate = np.ones(4)
-            point_coordinate[0:3] = actor.mesh_matrix[0:3, index] - self.axis.coordinate
-            point_coordinate[0:3] = np.dot(self.axis.base, point_coordinate[0:3].T)
-            z = point_coordinate[2]
-            if z <= 0:
-                continue
-
-            projected_point = np.linalg.multi_dot([
-                intrinsic_parameter_matrix,
-                projection_matrix,
-                point_coordinate.T
-            ])
-            projected_actor[:, index] = projected_point / z
+    def redraw(self, plot_axis):
+        # Moves the drawn camera mesh in place
+        self.mesh_line.set_data_3d(self.mesh_matrix[0, :], self.mesh_matrix[1, :], self.mesh_matrix[2, :])
+
+        # Updates the camera axis
+        super().redraw(plot_axis)
+
+    def get_bounds(self):
+        axis_min, axis_max = super().get_bounds()
+        mesh_min, mesh_max = self.mesh_matrix[0:3, :].min(axis=1), self.mesh_matrix[0:3, :].max(axis=1)
+        return np.minimum(axis_min, mesh_min), np.maximum(axis_max, mesh_max)
+
+    def get_camera_view(self, plot_axis, scene: Scene, projected_scene: np.ndarray = None):
+        # Projects the scene actors at a 2D plane from the camera point of view, unless they're given projected
+        if projected_scene is None:
+            projected_scene = self.project_wireframe(scene)
 
         # Draws the camera view at the corresponding axis
-        plot_axis.plot(projected_actor[0, :], projected_actor[1, :], 'b')
-        plot_axis.set_xlim([-10, 10])
-        plot_axis.set_ylim([-10, 10])
+        self.view_line, = plot_axis.plot(projected_scene[0, :], projected_scene[1, :], 'b')
+        plot_axis.set_xlim([-VIEW_EXTENT, VIEW_EXTENT])
+        plot_axis.set_ylim([-VIEW_EXTENT, VIEW_EXTENT])
+
+    def redraw_camera_view(self, scene: Scene, projected_scene: np.ndarray = None):
+        # Updates the drawn camera view in place, the axis limits are kept
+        if projected_scene is None:
+            projected_scene = self.project_wireframe(scene)
+        self.view_line.set_data(projected_scene[0, :], projected_scene[1, :])
+
+    def project(self, actor: Actor):
+        # Projects the actor mesh at the camera image plane, without drawing it.
+        # Each shared vertex is projected once and then repeated along the mesh
+        mesh = actor.mesh
+        projected_vertices, visible = self.project_vertices(actor, mesh)
+        return projected_vertices[:, mesh.indices], visible[mesh.indices]
+
+    def project_vertices(self, actor: Actor, mesh: Mesh = None):
+        # Projects the unique vertices of the actor mesh (or the given one, drawn at the actor pose), the
+        # result is cached until the mesh, the actor or the camera pose or the intrinsic parameters change
+        mesh = mesh or actor.mesh
+        key = self.__get_projection_key(actor, mesh)
+        if self.__projection[0] == key:
+            return self.__projection[1]
+
+        rotation, coordinate = self.__get_model_view(actor)
+        projection = self.projector.project_points(
+            mesh.vertices.T,
+            self.get_intrinsic_parameter_matrix(),
+            rotation,
+            coordinate
+        )
+        self.__projection = (key, projection)
+        return projection
+
+    def project_polyline(self, scene: Scene, extent: float = VIEW_EXTENT):
+        # Projects the mesh polylines of the scene actors clipped to the camera frustum, as 2xM image coordinates
+        # where NaN columns break the line. Cached until any actor, the camera pose or its parameters change
+        instances = [[(actor, actor.mesh) for actor in actors] for actors in scene.get_instances()]
+        key = tuple(self.__get_projection_key(actor, mesh) for actors in instances for actor, mesh in actors)
+        key += (extent,)
+        if self.__polyline[0] == key:
+            return self.__polyline[1]
+
+        polylines = []
+        for actors in instances:
+            polyline = self.__project_instances_polyline(actors, extent)
+            polylines += [polyline, np.full([2, 1], np.nan, dtype=polyline.dtype)]
+        polyline = np.concatenate(polylines[:-1], axis=1) if polylines else np.zeros([2, 0])
+
+        self.__polyline = (key, polyline)
+        return polyline
+
+    def project_edges(self, scene: Scene, extent: float = VIEW_EXTENT):
+        # Projects the mesh edges of the scene actors (the feature ones when the scene feature angle is given)
+        # clipped to the camera frustum, as a 2xM line where each edge is its two ends followed by a NaN column.
+        # Cached as the polyline
+        instances = [[(actor, actor.mesh) for actor in actors] for actors in scene.get_instances()]
+        key = tuple(self.__get_projection_key(actor, mesh) for actors in instances for actor, mesh in actors)
+        key += (extent, scene.feature_angle)
+        if self.__edges[0] == key:
+            return self.__edges[1]
+
+        segments = [self.__project_instances_edges(actors, extent, scene.feature_angle) for actors in instances]
+        segments = np.concatenate(segments) if segments else np.zeros([0, 2, 2])
+        edges_line = np.full([segments.shape[0], 3, 2], np.nan, dtype=segments.dtype)
+        edges_line[:, 0:2] = segments
+        edges_line = edges_line.reshape(-1, 2)[:-1].T
+
+        self.__edges = (key, edges_line)
+        return edges_line
+
+    def project_wireframe(self, scene: Scene, extent: float = VIEW_EXTENT):
+        # Projected polyline or edge segments of the scene, as the wireframe is drawn
+        if scene.wireframe == 'edges':
+            return self.project_edges(scene, extent)
+        return self.project_polyline(scene, extent)
+
+    def clip_faces(self, actor: Actor, extent: float, cull_back_faces: bool = False, mesh: Mesh = None):
+        # Clips the actor mesh (or the given one) faces to the camera frustum. Returns the 3xM projected points,
+        # the faces indexing them, all in front of the near plane, and the actor face each one comes from. The
+        # actor hierarchy nodes outside the frustum are skipped, so only the vertices of the faces left are projected.
+        # The faces fully outside a frustum plane are dropped, the ones crossing the near plane are cut at it
+        mesh = mesh or actor.mesh
+        rotation, coordinate = self.__get_model_view(actor)
+        intrinsic_parameter_matrix = self.get_intrinsic_parameter_matrix()
+        face_indices = mesh.bvh.cull(self.__get_frustum_planes(rotation, coordinate, intrinsic_parameter_matrix,
+                                                                extent))
+        if cull_back_faces:
+            # Keeps the faces whose plane has the camera at its front side
+            front = np.dot(mesh.normals[face_indices], coordinate) > mesh.plane_offsets[face_indices]
+            face_indices = face_indices[front]
+
+        # Projects the vertices of the faces left, which are indexed again from zero
+        faces = mesh.faces[face_indices]
+        used = np.zeros(mesh.vertices.shape[0], dtype=bool)
+        used[faces] = True
+        vertex_indices = np.flatnonzero(used)
+        new_indices = np.zeros(used.size, dtype=faces.dtype)
+        new_indices[vertex_indices] = np.arange(vertex_indices.size, dtype=faces.dtype)
+        faces = new_indices[faces]
+
+        projected_vertices, visible = self.projector.project_points(
+            mesh.vertices[vertex_indices].T,
+            intrinsic_parameter_matrix,
+            rotation,
+            coordinate
+        )
+
+        outcodes = self.projector.get_outcodes(projected_vertices, visible, extent)[faces.T]
+        inside = (outcodes[0] & outcodes[1] & outcodes[2]) == 0
+        crossing = inside & (((outcodes[0] | outcodes[1] | outcodes[2]) & NEAR) != 0)
+
+        kept = np.flatnonzero(inside & ~crossing)
+        crossing = np.flatnonzero(crossing)
+        if crossing.size == 0:
+            return projected_vertices, faces[kept], face_indices[kept]
+
+        # The clipped faces corners are appended to the projected vertices
+        corners = self.projector.to_camera_coordinates(
+            rotation,
+            coordinate,
+            mesh.vertices[vertex_indices[faces[crossing].ravel()]].T
+        ).T.reshape(-1, 3, 3)
+        clipped_corners, sources = self.projector.clip_triangles(corners)
+        clipped_points = self.projector.to_image_coordinates(
+            intrinsic_parameter_matrix,
+            clipped_corners.reshape(-1, 3).T
+        )
+        clipped_faces = projected_vertices.shape[1] + np.arange(clipped_points.shape[1]).reshape(-1, 3)
+
+        return (
+            np.concatenate([projected_vertices, clipped_points], axis=1),
+            np.concatenate([faces[kept], clipped_faces.astype(faces.dtype)]),
+            np.concatenate([face_indices[kept], face_indices[crossing[sources]]])
+        )
+
+    def clip_instances(self, instances: list, extent: float, cull_back_faces: bool = False):
+        # Same as clip_faces, for the (actor, mesh) instances of a mesh, whose vertices are projected at once
+        # through the stacked model to image matrices of the actors. Returns as well the instance each face
+        # comes from. A single instance is clipped through its hierarchy instead
+        if len(instances) == 1:
+            projected_vertices, faces, face_indices = self.clip_faces(
+                instances[0][0],
+                extent,
+                cull_back_faces,
+                instances[0][1]
+            )
+            return projected_vertices, faces, np.zeros(face_indices.size, dtype=np.int64), face_indices
+
+        mesh = instances[0][1]
+        rotations, coordinates, projection_matrices = self.__get_instances_model_view(instances)
+        projected_instances, visible_instances = self.projector.project_frames(projection_matrices, mesh.vertices.T)
+        vertices_count, faces_count = mesh.vertices.shape[0], mesh.faces.shape[0]
+        projected_vertices = projected_instances.transpose(1, 0, 2).reshape(3, -1)
+
+        # The instance i face f indexes the i N + v vertices
+        instance_offsets = vertices_count * np.arange(len(instances), dtype=mesh.faces.dtype)
+        outcodes = self.projector.get_outcodes(projected_vertices, visible_instances.ravel(), extent)
+        outcodes = outcodes[mesh.faces.T[:, np.newaxis, :] + instance_offsets[:, np.newaxis]]
+        inside = (outcodes[0] & outcodes[1] & outcodes[2]) == 0
+        if cull_back_faces:
+            # Keeps the faces whose plane has the camera at its front side
+            inside &= np.dot(coordinates, mesh.normals.T) > mesh.plane_offsets
+        crossing = inside & (((outcodes[0] | outcodes[1] | outcodes[2]) & NEAR) != 0)
+
+        kept = np.flatnonzero(inside & ~crossing)
+        kept_instances, kept_face_indices = kept // faces_count, kept % faces_count
+        kept_faces = mesh.faces[kept_face_indices] + instance_offsets[kept_instances, np.newaxis]
+        crossing = np.flatnonzero(crossing)
+        if crossing.size == 0:
+            return projected_vertices, kept_faces, kept_instances, kept_face_indices
+
+        # The clipped faces corners are appended to the projected vertices
+        crossing_instances, crossing_face_indices = crossing // faces_count, crossing % faces_count
+        corners = np.matmul(
+            mesh.vertices[mesh.faces[crossing_face_indices]] - coordinates[crossing_instances, np.newaxis],
+            rotations[crossing_instances].transpose(0, 2, 1)
+        )
+        clipped_corners, sources = self.projector.clip_triangles(corners)
+        clipped_points = self.projector.to_image_coordinates(
+            self.get_intrinsic_parameter_matrix(),
+            clipped_corners.reshape(-1, 3).T
+        )
+        clipped_faces = projected_vertices.shape[1] + np.arange(clipped_points.shape[1]).reshape(-1, 3)
+
+        return (
+            np.concatenate([projected_vertices, clipped_points], axis=1),
+            np.concatenate([kept_faces, clipped_faces.astype(kept_faces.dtype)]),
+            np.concatenate([kept_instances, crossing_instances[sources]]),
+            np.concatenate([kept_face_indices, crossing_face_indices[sources]])
+        )
+
+    def shade_faces(self, actor: Actor, face_indices: np.ndarray, mesh: Mesh = None):
+        # Lambertian intensity of the actor mesh (or the given one) faces lit from the camera, along its optical axis
+        mesh = mesh or actor.mesh
+        light_direction = -np.dot(actor.pose[0:3, 0:3].T, self.pose[2, 0:3])
+        return np.clip(np.dot(mesh.normals[face_indices], light_direction.astype(mesh.normals.dtype)), 0, 1)
+
+    def shade_instances(self, instances: list, instance_indices: np.ndarray, face_indices: np.ndarray):
+        # Same as shade_faces, for the faces of the (actor, mesh) instances of a mesh
+        normals = instances[0][1].normals[face_indices]
+        light_directions = -np.array([np.dot(actor.pose[0:3, 0:3].T, self.pose[2, 0:3]) for actor, _ in instances],
+                                     dtype=normals.dtype)
+        return np.clip(np.einsum('ij,ij->i', normals, light_directions[instance_indices]), 0, 1)
+
+    def pick(self, actor: Actor, image_point: np.ndarray):
+        # Actor face (of the full detail mesh) seen at the image plane point and the world coordinate
+        # where it's seen, (None, None) when no face is seen there. The ray starts at the near plane
+        rotation, coordinate = self.__get_model_view(actor)
+        camera_direction = np.linalg.solve(self.get_intrinsic_parameter_matrix(), [image_point[0], image_point[1], 1])
+        direction = np.dot(rotation.T, camera_direction)
+        origin = coordinate + self.projector.near * direction
+
+        mesh = actor.levels.meshes[0]
+        face, t = mesh.bvh.intersect_ray(mesh.vertices, mesh.faces, origin, direction)
+        if face is None:
+            return None, None
+        return face, actor.to_world(origin + t * direction)
+
+    def get_projection_matrix(self):
+        # 3x4 world to image matrix K [B | -B c], where B is the camera base and c its world coordinate.
+        # Built once for each camera pose and intrinsic parameters. The version is read before the pose,
+        # as at Object.get_cached
+        key = (self.pose_version,) + self.__get_intrinsic_key()
+        if self.__projection_matrix[0] == key:
+            return self.__projection_matrix[1]
+
+        pose = self.pose
+        extrinsic_matrix = np.zeros([3, 4])
+        extrinsic_matrix[:, 0:3] = pose[0:3, 0:3]
+        extrinsic_matrix[:, 3] = -np.dot(pose[0:3, 0:3], self.to_world(self.model_coordinate, pose))
+        projection_matrix = np.dot(self.get_intrinsic_parameter_matrix(), extrinsic_matrix)
+        projection_matrix.flags.writeable = False
+
+        self.__projection_matrix = (key, projection_matrix)
+        return projection_matrix
 
     def get_intrinsic_parameter_matrix(self):
-        return np.array([
-            [(self.f * self.sx), (self.f * self.so), self.ox],
-            [0, (self.f * self.sy), self.oy],
-            [0, 0, 1]
-        ])
\ No newline at end of file
+        # Built once for each set of intrinsic parameters
+        key = self.__get_intrinsic_key()
+        if self.__intrinsic_parameter_matrix[0] == key:
+            return self.__intrinsic_parameter_matrix[1]
+
+        intrinsic_parameter_matrix = self.get_intrinsic_parameter_matrices(np.array([key]))[0]
+        intrinsic_parameter_matrix.flags.writeable = False
+
+        self.__intrinsic_parameter_matrix = (key, intrinsic_parameter_matrix)
+        return intrinsic_parameter_matrix
+
+    @staticmethod
+    def get_intrinsic_parameter_matrices(camera_params: np.ndarray):
+        # (F, 3, 3) intrinsic matrices of the (F, 6) f, sx, sy, so, ox and oy parameters, leaving every camera as it is
+        f, sx, sy, so, ox, oy = np.asarray(camera_params, dtype=float).T
+        intrinsic_parameter_matrices = np.zeros([f.size, 3, 3])
+        intrinsic_parameter_matrices[:, 0] = np.stack([f * sx, f * so, ox], axis=1)
+        intrinsic_parameter_matrices[:, 1, 1:3] = np.stack([f * sy, oy], axis=1)
+        intrinsic_parameter_matrices[:, 2, 2] = 1
+        return intrinsic_parameter_matrices
+
+    def __get_intrinsic_key(self):
+        return self.f, self.sx, self.sy, self.so, self.ox, self.oy
+
+    def __get_projection_key(self, actor: Actor, mesh: Mesh):
+        # The actor and mesh themselves are kept at the key, so a cached entry is never matched by another object
+        # given the id of a collected one
+        return (actor, mesh, actor.pose_version, self.pose_version) + self.__get_intrinsic_key()
+
+    def __project_instances_polyline(self, instances: list, extent: float):
+        # Projects the polylines of the (actor, mesh) instances of a mesh at once, through the stacked
+        # model to image matrices of the actors. The instances vertices are handled as the vertices of a
+        # single mesh, the instance i vertex v being the i N + v one
+        mesh = instances[0][1]
+        rotations, coordinates, projection_matrices = self.__get_instances_model_view(instances)
+        projected_instances, visible_instances = self.projector.project_frames(projection_matrices, mesh.vertices.T)
+        vertices_count, indices_count = mesh.vertices.shape[0], mesh.indices.size
+        projected_vertices = projected_instances.transpose(1, 0, 2).reshape(3, -1)
+        indices = (mesh.indices + vertices_count * np.arange(len(instances))[:, np.newaxis]).ravel()
+
+        # Drops the segments fully outside a frustum plane, like the ones behind the camera,
+        # and the ones joining the last vertex of an instance to the first of the next one
+        outcodes = self.projector.get_outcodes(projected_vertices, visible_instances.ravel(), extent)[indices]
+        segments = np.flatnonzero(
+            ((outcodes[:-1] & outcodes[1:]) == 0) & (np.arange(indices.size - 1) % indices_count != indices_count - 1)
+        )
+        starts = projected_vertices[0:2, indices[segments]]
+        ends = projected_vertices[0:2, indices[segments + 1]]
+
+        # The segments crossing the near plane are cut at it
+        starts_clipped = (outcodes[segments] & NEAR) != 0
+        ends_clipped = (outcodes[segments + 1] & NEAR) != 0
+        crossing = np.flatnonzero(starts_clipped | ends_clipped)
+        if crossing.size:
+            crossing_segments = segments[crossing]
+            crossing_instances = crossing_segments // indices_count
+            camera_starts, camera_ends = [
+                np.einsum(
+                    'kij,kj->ik',
+                    rotations[crossing_instances],
+                    mesh.vertices[mesh.indices[positions % indices_count]] - coordinates[crossing_instances]
+                )
+                for positions in [crossing_segments, crossing_segments + 1]
+            ]
+            camera_starts, camera_ends = self.projector.clip_segments(camera_starts, camera_ends)
+            intrinsic_parameter_matrix = self.get_intrinsic_parameter_matrix()
+            starts[:, crossing] = self.projector.to_image_coordinates(intrinsic_parameter_matrix, camera_starts)[0:2]
+            ends[:, crossing] = self.projector.to_image_coordinates(intrinsic_parameter_matrix, camera_ends)[0:2]
+
+        # Each segment continues the line when it starts where the previous one ended,
+        # otherwise the line is broken and started again
+        continued = np.zeros(segments.size, dtype=bool)
+        continued[1:] = (segments[1:] == segments[:-1] + 1) & ~ends_clipped[:-1] & ~starts_clipped[1:]
+        restarted = np.flatnonzero(~continued)
+        sizes = np.where(continued, 1, 3)
+        if sizes.size:
+            sizes[0] = 2
+        ends_position = np.cumsum(sizes) - 1
+
+        polyline = np.full([2, sizes.sum()], np.nan, dtype=projected_vertices.dtype)
+        polyline[:, ends_position] = ends
+        polyline[:, ends_position[restarted] - 1] = starts[:, restarted]
+        return polyline
+
+    def __project_instances_edges(self, instances: list, extent: float, feature_angle: float = None):
+        # Projects the edges of the (actor, mesh) instances of a mesh at once as (S, 2, 2) image segments, as
+        # the polyline. The instance i edges join the i N + v vertices
+        mesh = instances[0][1]
+        mesh_edges = mesh.get_edges(feature_angle)
+        rotations, coordinates, projection_matrices = self.__get_instances_model_view(instances)
+        projected_instances, visible_instances = self.projector.project_frames(projection_matrices, mesh.vertices.T)
+        vertices_count = mesh.vertices.shape[0]
+        projected_vertices = projected_instances.transpose(1, 0, 2).reshape(3, -1)
+        edges = (mesh_edges + vertices_count * np.arange(len(instances))[:, np.newaxis, np.newaxis]).reshape(-1, 2)
+
+        # Drops the edges fully outside a frustum plane, like the ones behind the camera
+        outcodes = self.projector.get_outcodes(projected_vertices, visible_instances.ravel(), extent)[edges]
+        kept = np.flatnonzero((outcodes[:, 0] & outcodes[:, 1]) == 0)
+        edges, outcodes = edges[kept], outcodes[kept]
+        segments = projected_vertices[0:2, edges].transpose(1, 2, 0)
+
+        # The edges crossing the near plane are cut at it
+        crossing = np.flatnonzero(((outcodes[:, 0] | outcodes[:, 1]) & NEAR) != 0)
+        if crossing.size:
+            crossing_instances = edges[crossing, 0] // vertices_count
+            camera_starts, camera_ends = [
+                np.einsum(
+                    'kij,kj->ik',
+                    rotations[crossing_instances],
+                    mesh.vertices[edges[crossing, end] % vertices_count] - coordinates[crossing_instances]
+                )
+                for end in range(2)
+            ]
+            intrinsic_parameter_matrix = self.get_intrinsic_parameter_matrix()
+            segments[crossing] = np.stack([
+                self.projector.to_image_coordinates(intrinsic_parameter_matrix, camera_points)[0:2].T
+                for camera_points in self.projector.clip_segments(camera_starts, camera_ends)
+            ], axis=1)
+
+        return segments
+
+    def __get_instances_model_view(self, instances: list):
+        # Stacked model views of the (actor, mesh) instances, and their (I, 3, 4) model to image matrices
+        model_views = [self.__get_model_view(actor) for actor, _ in instances]
+        rotations = np.array([rotation for rotation, _ in model_views])
+        coordinates = np.array([coordinate for _, coordinate in model_views])
+        projection_matrices = np.zeros([len(instances), 3, 4])
+        projection_matrices[:, :, 0:3] = rotations
+        projection_matrices[:, :, 3] = -np.matmul(rotations, coordinates[:, :, np.newaxis])[:, :, 0]
+        return rotations, coordinates, np.matmul(self.get_intrinsic_parameter_matrix(), projection_matrices)
+
+    def __get_model_view(self, actor: Actor):
+        # Camera base and coordinate at the actor model space, so the camera reference frame coordinates of
+        # the model points p are rotation (p - coordinate), as at Projector.to_camera_coordinates. They're given
+        # the actor mesh precision, so its vertices aren't upcast. Cached for each actor until its pose or the
+        # camera one changes
+        key = (actor.pose_version, self.pose_version)
+        cached = self.__model_views.get(actor)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+
+        actor_pose, camera_pose = actor.pose, self.pose
+        camera_coordinate = self.to_world(self.model_coordinate, camera_pose)
+        dtype = actor.mesh.vertices.dtype
+        model_view = (
+            np.dot(camera_pose[0:3, 0:3], actor_pose[0:3, 0:3]).astype(dtype, copy=False),
+            np.dot(actor_pose[0:3, 0:3].T, camera_coordinate - actor_pose[0:3, 3]).astype(dtype, copy=False)
+        )
+        for matrix in model_view:
+            matrix.flags.writeable = False
+
+        self.__model_views[actor] = (key, model_view)
+        return model_view
+
+    def __get_frustum_planes(
+            self,
+            rotation: np.ndarray,
+            coordinate: np.ndarray,
+            intrinsic_parameter_matrix: np.ndarray,
+            extent: float
+    ):
+        # (5, 4) near and image window [-extent, extent] planes at the actor model space, the points p inside
+        # the frustum have plane[0:3] . p + plane[3] >= 0. At the camera reference frame, the image coordinate
+        # of a point P given by the intrinsic matrix row k is k . P / z, so it's at least -extent when
+        # (k + extent * z_axis) . P >= 0 and at most extent when (-k + extent * z_axis) . P >= 0
+        z_axis = np.array([0, 0, 1])
+        camera_planes = np.zeros([5, 4])
+        camera_planes[0] = [0, 0, 1, -self.projector.near]
+        for index, sign in enumerate([1, -1]):
+            camera_planes[1 + index, 0:3] = sign * intrinsic_parameter_matrix[0] + extent * z_axis
+            camera_planes[3 + index, 0:3] = sign * intrinsic_parameter_matrix[1] + extent * z_axis
+
+        # Moves the planes to the model space, where P = rotation (p - coordinate)
+        planes = np.zeros([5, 4])
+        planes[:, 0:3] = np.dot(camera_planes[:, 0:3], rotation)
+        planes[:, 3] = camera_planes[:, 3] - np.dot(planes[:, 0:3], coordinate)
+        return planes
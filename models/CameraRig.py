@@ -0,0 +1,86 @@
+import numpy as np
+
+from models.Projector import Projector, NEAR
+from models.Scene import Scene
+
+
+class CameraRig:
+    def __init__(self, cameras: list):
+        # Cameras rendered together, each with its own intrinsic parameters and pose
+        self.cameras = cameras
+        self.projector = Projector()
+        self.__world_mesh = (None, None)
+        self.__projection_matrices = ([], None)
+
+    def get_projection_matrices(self):
+        # (C, 3, 4) world to image matrices of the cameras, stacked again only when any of them changes
+        projection_matrices = [camera.get_projection_matrix() for camera in self.cameras]
+        cached_matrices = self.__projection_matrices[0]
+        if len(cached_matrices) != len(projection_matrices) or any(
+                matrix is not cached for matrix, cached in zip(projection_matrices, cached_matrices)):
+            self.__projection_matrices = (projection_matrices, np.array(projection_matrices))
+        return self.__projection_matrices[1]
+
+    def get_world_mesh(self, scene: Scene):
+        # Every scene actor moved to the world and joined as a single mesh: the (V, 3) vertices, the (F, 3)
+        # faces, their (F, 3) unit normals and plane offsets, at the meshes precision. The instances of each mesh
+        # are moved at once, and the result is cached until any actor mesh or pose changes, so it's shared by
+        # every camera
+        instances = {}
+        key = []
+        for actor in scene.actors:
+            mesh = actor.mesh
+            key.append((mesh, actor.pose_version))
+            instances.setdefault(id(mesh), (mesh, []))[1].append(actor.pose)
+
+        key = tuple(key)
+        if self.__world_mesh[0] == key:
+            return self.__world_mesh[1]
+
+        vertices, faces, normals, plane_offsets = [], [], [], []
+        vertices_count = 0
+        for mesh, poses in instances.values():
+            poses = np.array(poses, dtype=mesh.vertices.dtype)
+            rotations_transposed, translations = poses[:, 0:3, 0:3].transpose(0, 2, 1), poses[:, 0:3, 3]
+            instance_vertices = np.matmul(mesh.vertices, rotations_transposed) + translations[:, np.newaxis]
+            instance_normals = np.matmul(mesh.normals, rotations_transposed)
+            instance_plane_offsets = mesh.plane_offsets + np.einsum('ifj,ij->if', instance_normals, translations)
+            vertices.append(instance_vertices.reshape(-1, 3))
+            normals.append(instance_normals.reshape(-1, 3))
+            plane_offsets.append(instance_plane_offsets.ravel())
+
+            first_vertices = vertices_count + mesh.vertices.shape[0] * np.arange(poses.shape[0], dtype=np.int64)
+            faces.append((mesh.faces + first_vertices[:, np.newaxis, np.newaxis]).reshape(-1, 3))
+            vertices_count += mesh.vertices.shape[0] * poses.shape[0]
+
+        world_mesh = tuple(np.concatenate(arrays) for arrays in [vertices, faces, normals, plane_offsets])
+        self.__world_mesh = (key, world_mesh)
+        return world_mesh
+
+    def project(self, vertices: np.ndarray):
+        # Projects the (V, 3) world vertices through every camera at once, returns the (C, 3, V) projected
+        # vertices (the third row is the depth) and the (C, V) mask of the ones in front of each near plane
+        return self.projector.project_frames(self.get_projection_matrices(), vertices.T)
+
+    def cull_faces(
+            self,
+            camera_index: int,
+            projected_vertices: np.ndarray,
+            visible: np.ndarray,
+            faces: np.ndarray,
+            normals: np.ndarray,
+            plane_offsets: np.ndarray,
+            extent: float
+    ):
+        # Indices of the world faces the camera draws: the front faces not fully outside its image window
+        # [-extent, extent]. The faces crossing the near plane are dropped, as at the trajectory frames
+        camera = self.cameras[camera_index]
+        outcodes = self.projector.get_outcodes(projected_vertices, visible, extent)[faces.T]
+        drawn = (outcodes[0] & outcodes[1] & outcodes[2]) == 0
+        drawn &= ((outcodes[0] | outcodes[1] | outcodes[2]) & NEAR) == 0
+        drawn &= np.dot(normals, camera.to_world(camera.model_coordinate).astype(normals.dtype)) > plane_offsets
+        return np.flatnonzero(drawn)
+
+    def shade_faces(self, camera_index: int, normals: np.ndarray):
+        # Lambertian intensity of the world faces lit from the camera, along its optical axis
+        return np.clip(np.dot(normals, -self.cameras[camera_index].pose[2, 0:3].astype(normals.dtype)), 0, 1)
@@ -1,9 +1,8 @@
-import matplotlib
 import numpy as np
-import matplotlib.pyplot as plt
-
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-matplotlib.use('Qt5Agg')
+from matplotlib.figure import Figure
+
+from models.Profiler import Profiler
 
 
 class Chart(FigureCanvas):
@@ -15,25 +14,35 @@ class Chart(FigureCanvas):
         dpi: int = 100,
         projection: str = None,
         title: str = None,
-        ion: bool = False,
-        aspect: str = None
+        aspect: str = None,
+        profiler: Profiler = None
     ):
-        fig = plt.figure(figsize=(width, height), dpi=dpi)
+        # The figure is drawn by its own Qt canvas, without pyplot, so importing the chart neither switches
+        # the global backend nor registers the figure at the pyplot figures kept alive
+        fig = Figure(figsize=(width, height), dpi=dpi)
+        axis = fig.add_subplot(projection=projection)
         if title is not None:
-            plt.title(title)
-        if ion:
-            plt.ion()
-
-        axis = plt.axes(projection=projection)
+            # At the figure, since the axis is cleared when its view is drawn again
+            fig.suptitle(title)
 
         self.axis = axis
         super().__init__(fig)
 
+        # The Agg rendering of the figure is timed as a frame stage, named after the chart
+        self.profiler = profiler
+        self.span_name = 'agg_render_{}'.format((title or 'chart').replace(' ', '_'))
+
         if aspect == 'equal':
             self.__axis_equal_3D()
         elif aspect is not None:
             self.axis.set_aspect(aspect)
 
+    def draw(self):
+        if self.profiler is None:
+            return super().draw()
+        with self.profiler.span(self.span_name):
+            return super().draw()
+
     def axis_equal(self):
         if self.axis.name == '3d':
             self.__axis_equal_3D()
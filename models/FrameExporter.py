@@ -0,0 +1,115 @@
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+# Codec of each video extension, any other output path is a directory of images
+VIDEO_CODECS = {'.mp4': 'mp4v', '.mov': 'mp4v', '.avi': 'MJPG', '.mkv': 'XVID'}
+
+# Frames waiting to be written, the renderer only waits for the writer when it's this many frames behind
+QUEUE_SIZE = 8
+
+
+class FrameExporter:
+    def __init__(
+            self,
+            output_path: str,
+            file_pattern: str = 'frame_{:05d}.png',
+            fps: float = 30,
+            queue_size: int = QUEUE_SIZE
+    ):
+        # Writes a stream of frames, from a thread of its own, to a video when the output path has a video
+        # extension, otherwise to the output directory as a sequence of files named by the pattern (.npy files
+        # are saved as arrays). The frames are copied to a bounded queue, so the memory used doesn't grow with
+        # the sequence length and the renderer only waits when the writer falls a full queue behind
+        self.output_path = output_path
+        self.file_pattern = file_pattern
+        self.fps = fps
+        self.codec = VIDEO_CODECS.get(os.path.splitext(output_path)[1].lower())
+        self.video_size = None
+        os.makedirs(output_path if self.codec is None else os.path.dirname(output_path) or '.', exist_ok=True)
+
+        # Frames written and the seconds spent writing them, and the seconds the renderer waited for the writer
+        self.stats = {'frames': 0, 'seconds': 0.0, 'wait_seconds': 0.0}
+        self.closed = False
+        self.__frames = queue.Queue(maxsize=queue_size)
+        self.__error = None
+        self.__video_writer = None
+        self.__thread = threading.Thread(target=self.__run, name='FrameExporter', daemon=True)
+        self.__thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self.close()
+
+    def write(self, frame: np.ndarray):
+        # Queues a copy of the frame, so its buffer can be drawn again right away. An error of the writer is
+        # raised by the next write
+        if self.closed:
+            raise ValueError('write to a closed frame exporter')
+        self.__raise_error()
+
+        start_time = time.perf_counter()
+        self.__frames.put(np.array(frame))
+        self.stats['wait_seconds'] += time.perf_counter() - start_time
+
+    def close(self):
+        # Waits for the queued frames to be written and closes the video
+        if self.closed:
+            return
+        self.closed = True
+        self.__frames.put(None)
+        self.__thread.join()
+        self.__raise_error()
+
+    def __run(self):
+        # After an error the frames are still taken from the queue, unwritten, so the renderer never blocks on it
+        index = 0
+        while True:
+            frame = self.__frames.get()
+            if frame is None:
+                break
+
+            if self.__error is None:
+                start_time = time.perf_counter()
+                try:
+                    self.__write(index, frame)
+                    self.stats['frames'] += 1
+                except Exception as error:
+                    self.__error = error
+                self.stats['seconds'] += time.perf_counter() - start_time
+            index += 1
+
+        if self.__video_writer is not None:
+            self.__video_writer.release()
+
+    def __write(self, index: int, frame: np.ndarray):
+        import cv2
+
+        if self.codec is None:
+            frame_path = os.path.join(self.output_path, self.file_pattern.format(index))
+            if frame_path.endswith('.npy'):
+                np.save(frame_path, frame)
+            elif not cv2.imwrite(frame_path, frame):
+                raise OSError('could not write the frame {}'.format(frame_path))
+            return
+
+        # The video is opened with the size (and color) of the first frame, the next ones must match it
+        size = (frame.shape[1], frame.shape[0])
+        if self.__video_writer is None:
+            self.__video_writer = cv2.VideoWriter(self.output_path, cv2.VideoWriter_fourcc(*self.codec), self.fps,
+                                                  size, frame.ndim == 3)
+            self.video_size = size
+            if not self.__video_writer.isOpened():
+                raise OSError('could not open the video {}'.format(self.output_path))
+        elif size != self.video_size:
+            raise ValueError('frame {} is {}x{}, the video is {}x{}'.format(index, *size, *self.video_size))
+        self.__video_writer.write(frame)
+
+    def __raise_error(self):
+        if self.__error is not None:
+            raise self.__error
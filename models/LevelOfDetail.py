@@ -0,0 +1,47 @@
+import numpy as np
+
+from models.Mesh import Mesh
+from models.MeshCache import MeshCache
+
+# Meshes with fewer faces aren't simplified any further
+MIN_LEVEL_FACES = 2000
+
+# Most simplified levels kept, each one with about a quarter of the faces of the previous one
+MAX_LEVELS = 4
+
+
+class LevelOfDetail:
+    def __init__(self, meshes: list):
+        # Versions of a mesh from the full detail one down to the most simplified one
+        self.meshes = meshes
+
+    @classmethod
+    def build(cls, mesh: Mesh):
+        # Simplifies the mesh by vertex clustering, each level grid cells being twice as large as the previous
+        meshes = [mesh]
+        if mesh.faces.shape[0] < 4 * MIN_LEVEL_FACES:
+            return cls(meshes)
+
+        # A surface grid of n cells per side keeps about 2 n ^ 2 faces, the first level keeps about a quarter
+        size = (mesh.vertices.max(axis=0) - mesh.vertices.min(axis=0)).max()
+        cell_size = size / np.sqrt(mesh.faces.shape[0] / 8)
+        while len(meshes) <= MAX_LEVELS:
+            level = meshes[-1].decimate(cell_size)
+            if level.faces.shape[0] < MIN_LEVEL_FACES or level.faces.shape[0] > meshes[-1].faces.shape[0] / 2:
+                break
+            meshes.append(level)
+            cell_size *= 2
+
+        return cls(meshes)
+
+    @classmethod
+    def from_file(cls, mesh_path: str, dtype: type = float):
+        # Loads the mesh levels at the precision from the cache persisted alongside the mesh file, they're
+        # built (and saved) when it's missing or the mesh file has changed since then
+        mesh_cache = MeshCache(mesh_path, dtype)
+        meshes = mesh_cache.load()
+        if meshes is None:
+            meshes = cls.build(Mesh.from_file(mesh_path, dtype)).meshes
+            mesh_cache.save(meshes)
+
+        return cls(meshes)
@@ -0,0 +1,115 @@
+import numpy as np
+
+from models.Bvh import Bvh
+from models.StlLoader import StlLoader
+
+
+class Mesh:
+    def __init__(
+            self,
+            vertices: np.ndarray,
+            faces: np.ndarray,
+            normals: np.ndarray,
+            bvh: Bvh = None,
+            plane_offsets: np.ndarray = None,
+            edges: np.ndarray = None,
+            edge_angles: np.ndarray = None
+    ):
+        # Model space indexed triangle mesh: the (N, 3) vertices, the (F, 3) faces indices and the (F, 3)
+        # unit normals. It's never changed, so its arrays can be read together from any thread. The vertices
+        # floating point type is the precision every transform and projection of the mesh is made at
+        self.vertices = vertices
+        self.faces = faces
+        self.normals = normals
+
+        # Offset of each face plane along its normal, a point p is in front of the face when normal . p > offset
+        if plane_offsets is None:
+            plane_offsets = np.einsum('ij,ij->i', normals, vertices[faces[:, 0]])
+        self.plane_offsets = plane_offsets
+
+        # Order in which the vertices are drawn, one triangle after the other
+        self.indices = faces.ravel()
+
+        # Bounding volume hierarchy of the faces, valid under any pose
+        self.bvh = bvh if bvh is not None else Bvh.build(vertices, faces)
+
+        # (E, 2) unique edges of the faces, each one drawn once by the wireframe, and the angle (in degrees)
+        # between the normals of the two faces sharing each one. The open and non manifold edges have 180
+        if edges is None:
+            edges, edge_angles = self.__get_edges(faces, normals)
+        self.edges = edges
+        self.edge_angles = edge_angles
+        self.__feature_edges = (None, edges)
+
+    @classmethod
+    def from_file(cls, mesh_path: str, dtype: type = float):
+        # Loads the STL mesh at the precision (float32 halves the memory of large meshes)
+        vertices, faces, normals = StlLoader(mesh_path).load(dtype)
+        return cls(vertices, faces, normals)
+
+    def get_edges(self, feature_angle: float = None):
+        # Edges whose faces meet at the feature angle (in degrees) or more, like the creases and the outline of
+        # flat faces, every edge when it isn't given. Kept for the last feature angle asked for
+        feature_angle_edges = self.__feature_edges
+        if feature_angle_edges[0] != feature_angle:
+            edges = self.edges if feature_angle is None else self.edges[self.edge_angles >= feature_angle]
+            feature_angle_edges = (feature_angle, edges)
+            self.__feature_edges = feature_angle_edges
+        return feature_angle_edges[1]
+
+    def decimate(self, cell_size: float):
+        # Simplifies the mesh by vertex clustering: the vertices at each cell of a grid are merged into
+        # their mean, and the faces left with less than three different corners are dropped. The precision is kept
+        lower = self.vertices.min(axis=0)
+        cells = np.floor((self.vertices - lower) / cell_size).astype(np.int64)
+        cells_count = cells.max(axis=0) + 1
+        keys = (cells[:, 0] * cells_count[1] + cells[:, 1]) * cells_count[2] + cells[:, 2]
+        _, clusters = np.unique(keys, return_inverse=True)
+        clusters = clusters.ravel()
+
+        cluster_sizes = np.bincount(clusters)
+        vertices = np.stack([
+            np.bincount(clusters, weights=self.vertices[:, axis]) / cluster_sizes
+            for axis in range(3)
+        ], axis=1).astype(self.vertices.dtype)
+
+        faces = clusters[self.faces]
+        kept = (faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) & (faces[:, 2] != faces[:, 0])
+        faces = faces[kept]
+
+        # The faces merged into the same corners are kept once, each rotated to start at its smallest corner
+        rotation = (np.argmin(faces, axis=1)[:, np.newaxis] + np.arange(3)) % 3
+        faces = np.unique(np.take_along_axis(faces, rotation, axis=1), axis=0)
+
+        # Drops the clusters no face uses anymore
+        used = np.zeros(vertices.shape[0], dtype=bool)
+        used[faces] = True
+        new_indices = np.cumsum(used) - 1
+        vertices, faces = vertices[used], new_indices[faces].astype(self.faces.dtype)
+
+        return Mesh(
+            vertices,
+            faces,
+            StlLoader.get_unit_normals(vertices[faces], np.zeros(faces.shape), vertices.dtype)
+        )
+
+    @staticmethod
+    def __get_edges(faces: np.ndarray, normals: np.ndarray):
+        # Sorts the three edges of every face by their smallest and largest vertex, so the faces sharing an
+        # edge are next to each other, and keeps the first one of each run
+        face_edges = np.sort(faces[:, [[0, 1], [1, 2], [2, 0]]].reshape(-1, 2), axis=1)
+        keys = face_edges[:, 0].astype(np.int64) * (int(faces.max(initial=0)) + 1) + face_edges[:, 1]
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        first = np.ones(keys.size, dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        starts = np.flatnonzero(first)
+        counts = np.diff(np.append(starts, keys.size))
+        edges = face_edges[order[starts]]
+
+        # Angle between the normals of the two faces of each manifold edge
+        first_faces = order[starts] // 3
+        second_faces = order[np.minimum(starts + 1, keys.size - 1)] // 3
+        cosines = np.einsum('ij,ij->i', normals[first_faces], normals[second_faces])
+        edge_angles = np.where(counts == 2, np.degrees(np.arccos(np.clip(cosines, -1, 1))), 180).astype(np.float32)
+        return edges, edge_angles
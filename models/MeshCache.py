@@ -0,0 +1,110 @@
+import hashlib
+import os
+
+import numpy as np
+
+from models.Bvh import Bvh
+from models.Mesh import Mesh
+
+# Version of the cache layout, the caches written by any other version are built again
+CACHE_VERSION = 2
+
+# Blocks of the mesh file hashed for the cache key, evenly spaced along it (small files are hashed whole)
+HASH_BLOCKS = 16
+HASH_BLOCK_SIZE = 2 ** 16
+
+
+class MeshCache:
+    def __init__(self, mesh_path: str, dtype: type = float):
+        # Levels of detail preprocessed from a mesh file, each one with its hierarchy. They're persisted alongside
+        # the mesh file as a folder of raw .npy arrays for each precision, so later runs map them to memory (zero
+        # copy) instead of parsing and simplifying the mesh again
+        self.mesh_path = mesh_path
+        self.dtype = np.dtype(dtype)
+        self.cache_path = os.path.join(mesh_path + '.cache', self.dtype.name)
+
+    def get_signature(self):
+        # Key of the mesh file contents: the cache layout version, the file size, modification time and a hash
+        # of blocks spread along the file, so it's computed in constant time even for large scans
+        mesh_stat = os.stat(self.mesh_path)
+        digest = hashlib.blake2b(digest_size=8)
+        with open(self.mesh_path, 'rb') as mesh_file:
+            for offset in np.linspace(0, max(mesh_stat.st_size - HASH_BLOCK_SIZE, 0), HASH_BLOCKS).astype(np.int64):
+                mesh_file.seek(int(offset))
+                digest.update(mesh_file.read(HASH_BLOCK_SIZE))
+
+        return np.array([
+            CACHE_VERSION,
+            mesh_stat.st_size,
+            mesh_stat.st_mtime_ns,
+            int.from_bytes(digest.digest(), 'little', signed=True)
+        ], dtype=np.int64)
+
+    def load(self):
+        # Meshes of every level from the full detail one, or None when the cache is missing or the mesh file has
+        # changed since it was written. Their arrays are read only memory maps of the cache files
+        try:
+            header = np.load(self.__get_path('header'))
+            if not np.array_equal(header[0:4], self.get_signature()):
+                return None
+
+            levels_count, leaf_size = int(header[4]), int(header[5])
+            meshes = []
+            for level in range(levels_count):
+                arrays = {
+                    name: np.asarray(np.load(self.__get_path(name, level), mmap_mode='r'))
+                    for name in ['vertices', 'faces', 'normals', 'plane_offsets', 'face_order', 'lower', 'upper',
+                                 'edges', 'edge_angles']
+                }
+                meshes.append(Mesh(
+                    arrays['vertices'],
+                    arrays['faces'],
+                    arrays['normals'],
+                    Bvh(arrays['face_order'], arrays['lower'], arrays['upper'], leaf_size),
+                    arrays['plane_offsets'],
+                    arrays['edges'],
+                    arrays['edge_angles']
+                ))
+            return meshes
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def save(self, meshes: list):
+        # Persists the meshes of every level. The header is written last, so a cache left half written is never
+        # loaded, and each file is replaced as a whole, so the memory maps of other processes stay valid
+        header_path = self.__get_path('header')
+        try:
+            os.makedirs(self.cache_path, exist_ok=True)
+            if os.path.exists(header_path):
+                os.remove(header_path)
+
+            for level, mesh in enumerate(meshes):
+                for name, array in [
+                    ('vertices', mesh.vertices),
+                    ('faces', mesh.faces),
+                    ('normals', mesh.normals),
+                    ('plane_offsets', mesh.plane_offsets),
+                    ('face_order', mesh.bvh.face_order),
+                    ('lower', mesh.bvh.lower),
+                    ('upper', mesh.bvh.upper),
+                    ('edges', mesh.edges),
+                    ('edge_angles', mesh.edge_angles),
+                ]:
+                    self.__write(self.__get_path(name, level), array)
+
+            signature = self.get_signature()
+            self.__write(header_path, np.concatenate([signature, [len(meshes), meshes[0].bvh.leaf_size]]))
+        except OSError:
+            # The mesh folder may be read only, then the levels are built again next time
+            pass
+
+    def __get_path(self, name: str, level: int = None):
+        file_name = name if level is None else '{}_{}'.format(name, level)
+        return os.path.join(self.cache_path, file_name + '.npy')
+
+    @staticmethod
+    def __write(path: str, array: np.ndarray):
+        temporary_path = path + '.tmp'
+        with open(temporary_path, 'wb') as array_file:
+            np.save(array_file, np.ascontiguousarray(array))
+        os.replace(temporary_path, path)
@@ -1,37 +1,96 @@
+import itertools
+
 import numpy as np
 
 from models.Axis import Axis
 
+# Pose versions are drawn from a single counter, so no two objects (even one created where a collected one was)
+# ever share a version, and a version tells both the object and its state apart at the caches
+POSE_VERSIONS = itertools.count(1)
+
 
 class Object:
     def __init__(
             self,
-            coordinate: np.ndarray = None
+            coordinate: np.ndarray = None,
+            reference_frame: str = 'world'
     ):
         if coordinate is None:
             coordinate = np.zeros(3)
 
+        # Name of the reference frame the object axis gives, as chosen by the movement controls
+        self.reference_frame = reference_frame
+
+        # The model space coordinate is kept, the current one is given by the object pose
+        self.model_coordinate = coordinate
         self.coordinate = coordinate
         self.axis = Axis(coordinate=coordinate)
+        self.pose = np.eye(4)
+        self.pose_version = next(POSE_VERSIONS)
         self.previous_movement_matrix = np.eye(4)
+        self.__cache = {}
 
     def draw(self, plot_axis):
         # Draws the object axis
         self.axis.draw(plot_axis)
 
+    def redraw(self, plot_axis):
+        # Updates the object axis drawn by the last draw call
+        self.axis.redraw(plot_axis)
+
+    def get_bounds(self):
+        # Minimum and maximum world coordinates of the drawn object
+        return self.axis.get_bounds()
+
     def move(
             self,
             movement_matrix: np.ndarray
     ):
-        # Updates the current object position according to the movement matrix
-        coordinate = np.ones(4)
-        coordinate[0:3] = self.coordinate
-        coordinate = np.dot(movement_matrix, coordinate.T)
-        self.coordinate = coordinate[0: 3]
-
-        # Updates the axis base and coordinate as well
-        self.axis.coordinate = coordinate[0: 3]
-        self.axis.base = movement_matrix[0:3, 0:3]
+        # Composes the movement with the current object pose
+        self.set_pose(np.dot(movement_matrix, self.pose))
 
         # Stores the previous movement made
         self.previous_movement_matrix = movement_matrix
+
+    def set_pose(
+            self,
+            pose: np.ndarray
+    ):
+        # Replaces the object pose, the model space geometry is left untouched
+        self.pose = pose
+        self.pose_version = next(POSE_VERSIONS)
+        self.previous_movement_matrix = pose
+
+        # Updates the current object position according to the pose
+        coordinate = np.dot(pose[0:3, 0:3], self.model_coordinate) + pose[0:3, 3]
+        self.coordinate = coordinate
+
+        # Updates the axis base and coordinate as well
+        self.axis.coordinate = coordinate
+        self.axis.base = pose[0:3, 0:3]
+
+    def invalidate(self):
+        # Drops the values cached from the object geometry, when it's replaced. They're
+        # computed again as after a pose change
+        self.pose_version = next(POSE_VERSIONS)
+
+    def to_world(self, model_points: np.ndarray, pose: np.ndarray = None):
+        # Moves the (N, 3) model space points to the world according to the (current) object pose. The
+        # pose is given the points precision, so float32 points are moved as float32
+        if pose is None:
+            pose = self.pose
+        pose = pose.astype(np.result_type(model_points, np.float32), copy=False)
+        return np.dot(model_points, pose[0:3, 0:3].T) + pose[0:3, 3]
+
+    def get_cached(self, name: str, compute):
+        # Returns compute(pose), cached until the object pose changes. The version is read before
+        # the pose, so a value computed while the pose is replaced (from another thread) is never
+        # stored under the new version
+        version = self.pose_version
+        cached = self.__cache.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+
+        value = compute(self.pose)
+        self.__cache[name] = (version, value)
+        return value
@@ -0,0 +1,181 @@
+import numpy as np
+
+
+class Pose:
+    __slots__ = ('__quaternions', '__translations', '__matrices')
+
+    def __init__(
+            self,
+            quaternions: np.ndarray,
+            translations: np.ndarray,
+            matrices: np.ndarray = None
+    ):
+        # Rigid poses as (..., 4) unit quaternions (w, x, y, z) and (..., 3) translations, a single pose has
+        # no leading dimension. The (..., 4, 4) matrices the poses were read from, when they were, are kept
+        # and given back as they were, so the matrices round trip exactly. The fields are read-only copies,
+        # replacing any of them drops the kept matrices
+        self.__matrices = None
+        self.quaternions = quaternions
+        self.translations = translations
+        if matrices is not None:
+            self.__matrices = self.__read_only(matrices)
+
+    @property
+    def quaternions(self):
+        return self.__quaternions
+
+    @quaternions.setter
+    def quaternions(self, quaternions: np.ndarray):
+        self.__quaternions = self.__read_only(quaternions)
+        self.__matrices = None
+
+    @property
+    def translations(self):
+        return self.__translations
+
+    @translations.setter
+    def translations(self, translations: np.ndarray):
+        self.__translations = self.__read_only(translations)
+        self.__matrices = None
+
+    def __len__(self):
+        # A single pose has no length, as a 0-d array
+        if self.__quaternions.ndim < 2:
+            raise TypeError('len() of a single pose')
+        return self.__quaternions.shape[0]
+
+    def __getitem__(self, index):
+        return Pose(
+            self.__quaternions[index],
+            self.__translations[index],
+            None if self.__matrices is None else self.__matrices[index]
+        )
+
+    @classmethod
+    def identity(cls, count: int = None):
+        shape = [] if count is None else [count]
+        quaternions = np.zeros(shape + [4])
+        quaternions[..., 0] = 1
+        return cls(quaternions, np.zeros(shape + [3]))
+
+    @classmethod
+    def from_matrix(cls, matrices: np.ndarray):
+        # Reads the (..., 4, 4) movement matrices. Each quaternion is taken from the largest of the four
+        # (w, x, y, z) candidates of its rotation, the one with the least rounding, and w is kept positive
+        matrices = np.asarray(matrices, dtype=float)
+        (r00, r01, r02), (r10, r11, r12), (r20, r21, r22) = [
+            [matrices[..., row, column] for column in range(3)] for row in range(3)
+        ]
+        trace = r00 + r11 + r22
+        candidates = np.stack([
+            np.stack([1 + trace, r21 - r12, r02 - r20, r10 - r01], axis=-1),
+            np.stack([r21 - r12, 1 + r00 - r11 - r22, r01 + r10, r02 + r20], axis=-1),
+            np.stack([r02 - r20, r01 + r10, 1 - r00 + r11 - r22, r12 + r21], axis=-1),
+            np.stack([r10 - r01, r02 + r20, r12 + r21, 1 - r00 - r11 + r22], axis=-1),
+        ], axis=-2)
+        largest = np.argmax(np.stack([trace, r00, r11, r22], axis=-1), axis=-1)
+        quaternions = np.take_along_axis(candidates, largest[..., np.newaxis, np.newaxis], axis=-2)[..., 0, :]
+        quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+        quaternions *= np.where(quaternions[..., 0:1] < 0, -1, 1)
+
+        return cls(quaternions, matrices[..., 0:3, 3].copy(), matrices)
+
+    @classmethod
+    def from_axis_angle(cls, axes: np.ndarray, angles: np.ndarray, translations: np.ndarray = None):
+        # Rotations of the angles (in degrees) around the (..., 3) axes, by the right hand rule
+        axes = np.asarray(axes, dtype=float)
+        half_angles = np.pi * np.asarray(angles, dtype=float)[..., np.newaxis] / 360
+        quaternions = np.concatenate([
+            np.cos(half_angles),
+            np.sin(half_angles) * axes / np.linalg.norm(axes, axis=-1, keepdims=True)
+        ], axis=-1)
+        if translations is None:
+            translations = np.zeros(quaternions.shape[:-1] + (3,))
+        return cls(quaternions, translations)
+
+    def to_matrix(self):
+        # (..., 4, 4) movement matrices of the poses, new arrays the caller may change
+        if self.__matrices is not None:
+            return self.__matrices.copy()
+
+        w, x, y, z = [self.quaternions[..., index] for index in range(4)]
+        matrices = np.zeros(self.quaternions.shape[:-1] + (4, 4))
+        matrices[..., 0, 0] = 1 - 2 * (y * y + z * z)
+        matrices[..., 0, 1] = 2 * (x * y - w * z)
+        matrices[..., 0, 2] = 2 * (x * z + w * y)
+        matrices[..., 1, 0] = 2 * (x * y + w * z)
+        matrices[..., 1, 1] = 1 - 2 * (x * x + z * z)
+        matrices[..., 1, 2] = 2 * (y * z - w * x)
+        matrices[..., 2, 0] = 2 * (x * z - w * y)
+        matrices[..., 2, 1] = 2 * (y * z + w * x)
+        matrices[..., 2, 2] = 1 - 2 * (x * x + y * y)
+        matrices[..., 0:3, 3] = self.translations
+        matrices[..., 3, 3] = 1
+        return matrices
+
+    def compose(self, other: 'Pose'):
+        # Poses that apply the other ones and then these, as the product of their matrices. The batches
+        # are broadcast against each other
+        return Pose(
+            self.__multiply(self.quaternions, other.quaternions),
+            self.__rotate(self.quaternions, other.translations) + self.translations
+        )
+
+    def invert(self):
+        conjugates = self.quaternions * np.array([1, -1, -1, -1])
+        return Pose(conjugates, -self.__rotate(conjugates, self.translations))
+
+    def apply(self, points: np.ndarray):
+        # Moves the (N, 3) points by each pose, a batch of P poses gives (P, N, 3) points
+        return (
+            self.__rotate(self.quaternions[..., np.newaxis, :], points)
+            + self.translations[..., np.newaxis, :]
+        )
+
+    def interpolate(self, other: 'Pose', fractions: np.ndarray):
+        # Poses the fractions of the way from these poses to the other ones: the rotations are spherically
+        # interpolated (slerp) along the shortest arc and the translations linearly. A single pair of
+        # poses and (F,) fractions gives the F poses of a smooth animation between them
+        fractions = np.asarray(fractions, dtype=float)[..., np.newaxis]
+        start, end = self.quaternions, other.quaternions
+        cosines = np.sum(start * end, axis=-1, keepdims=True)
+        end = np.where(cosines < 0, -end, end)
+        cosines = np.abs(cosines)
+
+        # The nearly equal rotations are linearly interpolated, as the slerp weights are unstable there
+        angles = np.arccos(np.clip(cosines, -1, 1))
+        sines = np.sin(angles)
+        nearly_equal = sines < 1e-6
+        sines = np.where(nearly_equal, 1, sines)
+        start_weights = np.where(nearly_equal, 1 - fractions, np.sin((1 - fractions) * angles) / sines)
+        end_weights = np.where(nearly_equal, fractions, np.sin(fractions * angles) / sines)
+        quaternions = start_weights * start + end_weights * end
+        quaternions /= np.linalg.norm(quaternions, axis=-1, keepdims=True)
+
+        return Pose(quaternions, (1 - fractions) * self.translations + fractions * other.translations)
+
+    @staticmethod
+    def __read_only(values: np.ndarray):
+        values = np.array(values, dtype=float)
+        values.flags.writeable = False
+        return values
+
+    @staticmethod
+    def __multiply(first: np.ndarray, second: np.ndarray):
+        # Hamilton product of the (..., 4) quaternions
+        w1, x1, y1, z1 = [first[..., index] for index in range(4)]
+        w2, x2, y2, z2 = [second[..., index] for index in range(4)]
+        return np.stack([
+            w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2,
+            w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2,
+            w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2,
+            w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2,
+        ], axis=-1)
+
+    @staticmethod
+    def __rotate(quaternions: np.ndarray, vectors: np.ndarray):
+        # Rotates the (..., 3) vectors by the unit quaternions: v + 2 w (u x v) + 2 u x (u x v)
+        w, u = quaternions[..., 0:1], quaternions[..., 1:4]
+        u, vectors = np.broadcast_arrays(u, vectors)
+        cross = np.cross(u, vectors)
+        return vectors + 2 * w * cross + 2 * np.cross(u, cross)
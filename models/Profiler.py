@@ -0,0 +1,94 @@
+import contextlib
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+# Latest durations kept for each span name, their percentiles are reported
+WINDOW_SIZE = 600
+
+# Latest spans kept for the trace export
+TRACE_SIZE = 100000
+
+# Span returned while the profiler is disabled, entering it does nothing
+DISABLED_SPAN = contextlib.nullcontext()
+
+
+class Profiler:
+    def __init__(self, enabled: bool = False):
+        # Named timing spans of the frame stages, from any thread. While disabled, opening a span only
+        # reads this flag, so the instrumented paths keep their speed
+        self.enabled = enabled
+        self.origin = time.perf_counter()
+        self.durations = {}
+        self.events = deque(maxlen=TRACE_SIZE)
+        self.thread_names = {}
+        self.__lock = threading.Lock()
+
+    def span(self, name: str):
+        # Context timing the stage it wraps, as "with profiler.span('project'):"
+        if not self.enabled:
+            return DISABLED_SPAN
+        return self.__span(name)
+
+    def record(self, name: str, start_time: float, seconds: float):
+        # Records a span measured elsewhere, started at the perf_counter start time
+        with self.__lock:
+            if name not in self.durations:
+                self.durations[name] = deque(maxlen=WINDOW_SIZE)
+            self.durations[name].append(seconds)
+            thread = threading.current_thread()
+            self.thread_names[thread.ident] = thread.name
+            self.events.append((name, start_time, seconds, thread.ident))
+
+    def clear(self):
+        with self.__lock:
+            self.durations.clear()
+            self.events.clear()
+
+    def get_percentiles(self):
+        # p50, p95 and p99 seconds of the latest spans of each name, with their count, by name
+        with self.__lock:
+            durations = {name: np.array(name_durations) for name, name_durations in self.durations.items()}
+        percentiles = {}
+        for name, name_durations in durations.items():
+            percentiles[name] = dict(zip(['p50', 'p95', 'p99'], np.percentile(name_durations, [50, 95, 99]).tolist()))
+            percentiles[name]['count'] = name_durations.size
+        return percentiles
+
+    def export_trace(self, trace_path: str):
+        # Writes the latest spans as a Chrome trace event file, which chrome://tracing or Perfetto open
+        with self.__lock:
+            events = list(self.events)
+            thread_names = dict(self.thread_names)
+        process_id = os.getpid()
+
+        trace_events = [
+            {'name': 'thread_name', 'ph': 'M', 'pid': process_id, 'tid': thread_id, 'args': {'name': thread_name}}
+            for thread_id, thread_name in thread_names.items()
+        ]
+        trace_events += [
+            {
+                'name': name,
+                'cat': 'frame',
+                'ph': 'X',
+                'ts': 1e6 * (start_time - self.origin),
+                'dur': 1e6 * seconds,
+                'pid': process_id,
+                'tid': thread_id,
+            }
+            for name, start_time, seconds, thread_id in events
+        ]
+        with open(trace_path, 'w') as trace_file:
+            json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, trace_file)
+
+    @contextlib.contextmanager
+    def __span(self, name: str):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start_time, time.perf_counter() - start_time)
@@ -0,0 +1,133 @@
+import numpy as np
+
+# Outcode bits of the points outside each plane of the camera frustum
+NEAR, LEFT, RIGHT, BOTTOM, TOP = 1, 2, 4, 8, 16
+
+
+class Projector:
+    def __init__(
+            self,
+            near: float = 0.1
+    ):
+        # Points with a depth smaller or equal to the near plane are not projected, the near plane
+        # is kept in front of the camera center, as the clipped geometry is projected at it
+        self.near = near
+
+    def to_camera_coordinates(self, camera_base: np.ndarray, camera_coordinate: np.ndarray, points: np.ndarray):
+        # Moves the points to the camera reference frame (points are given as 3xN or 4xN), at their precision
+        dtype = self.get_dtype(points)
+        translated_points = points[0:3, :] - camera_coordinate.astype(dtype, copy=False).reshape(3, 1)
+        return np.dot(camera_base.astype(dtype, copy=False), translated_points)
+
+    def to_image_coordinates(self, intrinsic_parameter_matrix: np.ndarray, camera_points: np.ndarray):
+        # Projects the 3xN camera reference frame points, all in front of the near plane.
+        # The third row keeps the depth of each point, instead of the homogeneous 1
+        intrinsic_parameter_matrix = intrinsic_parameter_matrix.astype(self.get_dtype(camera_points), copy=False)
+        image_points = np.dot(intrinsic_parameter_matrix, camera_points) / camera_points[2, :]
+        image_points[2, :] = camera_points[2, :]
+        return image_points
+
+    def project(self, camera, points: np.ndarray):
+        # Projects all the points at the camera image plane in a single batched operation
+        return self.project_points(
+            points,
+            camera.get_intrinsic_parameter_matrix(),
+            camera.axis.base,
+            camera.axis.coordinate
+        )
+
+    def project_points(
+            self,
+            points: np.ndarray,
+            intrinsic_parameter_matrix: np.ndarray,
+            camera_base: np.ndarray,
+            camera_coordinate: np.ndarray
+    ):
+        # Same as project, for a camera given by its parameters
+        camera_points = self.to_camera_coordinates(camera_base, camera_coordinate, points)
+
+        # Discards the points behind the near plane, they're kept as zeros
+        visible = camera_points[2, :] > self.near
+
+        projected_points = np.zeros([3, points.shape[1]], dtype=camera_points.dtype)
+        projected_points[:, visible] = self.to_image_coordinates(intrinsic_parameter_matrix, camera_points[:, visible])
+
+        return projected_points, visible
+
+    def project_frames(self, projection_matrices: np.ndarray, points: np.ndarray):
+        # Projects the 3xN (or 4xN) points through a stack of (F, 3, 4) world to image matrices at once
+        projection_matrices = projection_matrices.astype(self.get_dtype(points), copy=False)
+        projected_points = np.matmul(projection_matrices[:, :, 0:3], points[0:3, :]) + projection_matrices[:, :, 3:4]
+
+        # Discards the points behind the near plane, they're kept as zeros
+        z = projected_points[:, 2, :]
+        visible = z > self.near
+        projected_points = np.divide(
+            projected_points,
+            z[:, np.newaxis, :],
+            out=np.zeros_like(projected_points),
+            where=visible[:, np.newaxis, :]
+        )
+        projected_points[:, 2, :] = np.where(visible, z, 0)
+
+        return projected_points, visible
+
+    @staticmethod
+    def get_dtype(points: np.ndarray):
+        # Precision the points are projected at, their own unless they aren't floating point. The camera
+        # matrices are given it, so float32 points aren't upcast by the float64 matrices
+        return np.result_type(points, np.float32)
+
+    def get_outcodes(self, projected_points: np.ndarray, visible: np.ndarray, extent: float):
+        # Frustum planes each projected point is outside of, the image window is [-extent, extent].
+        # The points behind the near plane are only told by it, as they have no image coordinates
+        outcodes = np.where(visible, 0, NEAR).astype(np.uint8)
+        for bit, outside in [
+            (LEFT, projected_points[0, :] < -extent),
+            (RIGHT, projected_points[0, :] > extent),
+            (BOTTOM, projected_points[1, :] < -extent),
+            (TOP, projected_points[1, :] > extent),
+        ]:
+            outcodes |= (visible & outside).view(np.uint8) * np.uint8(bit)
+
+        return outcodes
+
+    def clip_segments(self, starts: np.ndarray, ends: np.ndarray):
+        # Moves the 3xS camera reference frame segments ends behind the near plane to the plane.
+        # Each segment must have at least one end in front of it
+        starts_behind = starts[2, :] <= self.near
+        ends_behind = ends[2, :] <= self.near
+        clipped_starts = np.where(starts_behind, self.__intersect_near(ends, starts), starts)
+        clipped_ends = np.where(ends_behind, self.__intersect_near(starts, ends), ends)
+
+        return clipped_starts, clipped_ends
+
+    def clip_triangles(self, corners: np.ndarray):
+        # Clips the (K, 3, 3) camera reference frame triangles corners, each crossing the near plane.
+        # A triangle with a single corner behind the plane becomes two, the other ones keep a smaller
+        # one. Returns the clipped triangles corners and the index of the triangle each one comes from
+        behind = corners[:, :, 2] <= self.near
+        single_behind = behind.sum(axis=1) == 1
+
+        # Rotates the corners, keeping their winding, so the one at its own side of the plane goes first
+        lone_corner = np.where(single_behind, np.argmax(behind, axis=1), np.argmin(behind, axis=1))
+        rotation = (lone_corner[:, np.newaxis] + np.arange(3)) % 3
+        a, b, c = np.moveaxis(corners[np.arange(corners.shape[0])[:, np.newaxis], rotation], 1, 0)
+        ab = self.__intersect_near(b.T, a.T).T
+        ac = self.__intersect_near(c.T, a.T).T
+
+        quads = np.flatnonzero(single_behind)
+        triangles = np.flatnonzero(~single_behind)
+        clipped_corners = np.concatenate([
+            np.stack([ab[quads], b[quads], c[quads]], axis=1),
+            np.stack([ab[quads], c[quads], ac[quads]], axis=1),
+            np.stack([a[triangles], ab[triangles], ac[triangles]], axis=1),
+        ])
+
+        return clipped_corners, np.concatenate([quads, quads, triangles])
+
+    def __intersect_near(self, inside: np.ndarray, outside: np.ndarray):
+        # Points where the 3xS segments from the inside to the outside points cross the near plane
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = (self.near - inside[2, :]) / (outside[2, :] - inside[2, :])
+        return inside + (outside - inside) * t
@@ -0,0 +1,241 @@
+import numpy as np
+
+
+class Raster:
+    def __init__(
+            self,
+            width: int = 640,
+            height: int = 640,
+            extent: float = 10
+    ):
+        # The raster covers the [-extent, extent] window of the camera image plane
+        self.width = width
+        self.height = height
+        self.extent = extent
+        self.image = np.zeros([height, width], dtype=np.uint8)
+
+        # Depth buffer, keeps the inverse depth of the nearest surface drawn at each pixel (0 is infinitely far)
+        self.inverse_depth = np.zeros([height, width])
+
+    def clear(self):
+        self.image.fill(0)
+        self.inverse_depth.fill(0)
+
+    def to_pixels(self, points: np.ndarray):
+        # Maps image plane points (2xN or 3xN) to pixel columns and rows, the rows grow downwards
+        columns = (points[0, :] + self.extent) * self.width / (2 * self.extent)
+        rows = (points[1, :] + self.extent) * self.height / (2 * self.extent)
+        return np.array([columns, rows])
+
+    def to_image_plane(self, columns: np.ndarray, rows: np.ndarray):
+        # Image plane coordinates of the pixels centers, the inverse of to_pixels
+        return np.array([
+            (np.asarray(columns) + 0.5) * 2 * self.extent / self.width - self.extent,
+            (np.asarray(rows) + 0.5) * 2 * self.extent / self.height - self.extent,
+        ])
+
+    def draw_edges(
+            self,
+            points: np.ndarray,
+            faces: np.ndarray,
+            visible: np.ndarray = None,
+            value: int = 255
+    ):
+        # Draws the three edges of each triangle (faces index the 2xN or 3xN points) with visible vertices
+        faces = self.__get_visible_faces(faces, visible)
+        corners = self.to_pixels(points)[:, faces]
+        starts = corners.reshape(2, -1)
+        ends = np.roll(corners, -1, axis=2).reshape(2, -1)
+
+        return self.draw_segments(starts, ends, value)
+
+    def fill_triangles(
+            self,
+            points: np.ndarray,
+            faces: np.ndarray,
+            values: np.ndarray,
+            visible: np.ndarray = None,
+            depth_test: bool = False
+    ):
+        # Fills each triangle with visible vertices with its value. The later triangles are drawn over,
+        # unless the depth test is made, then the nearest ones are kept (points third row is the depth)
+        values = np.broadcast_to(values, [faces.shape[0]])
+        if visible is not None:
+            drawn = np.all(visible[faces], axis=1)
+            faces, values = faces[drawn], values[drawn]
+
+        pixels = self.to_pixels(points)
+        if depth_test:
+            # The inverse depth is linear at the image plane, so it's interpolated by the pixel weights
+            corners_inverse_depth = 1 / points[2][faces].T
+
+        for pixel_indices, face_indices, weights in self.rasterize_triangles(pixels, faces):
+            if depth_test:
+                pixel_indices, face_indices = self.__test_depth(
+                    pixel_indices,
+                    face_indices,
+                    np.einsum('ij,ij->j', weights, corners_inverse_depth[:, face_indices])
+                )
+            else:
+                # Equal pixels keep the value of the last face drawn
+                order = np.argsort(face_indices, kind='stable')
+                pixel_indices, face_indices = pixel_indices[order], face_indices[order]
+
+            self.image.reshape(-1)[pixel_indices] = values[face_indices]
+
+        return self.image
+
+    def rasterize_triangles(
+            self,
+            pixels: np.ndarray,
+            faces: np.ndarray,
+            max_samples: int = 2 ** 20
+    ):
+        # Yields, in chunks, the flat index of every pixel center covered by a triangle, the index of
+        # the triangle covering it and the barycentric weights of the pixel center at that triangle. The
+        # corners are taken as float64 whatever the points precision, the edge functions subtract products
+        # of pixel coordinates, which would keep too few float32 digits at large images
+        x = [pixels[0][faces[:, corner]].astype(float) for corner in range(3)]
+        y = [pixels[1][faces[:, corner]].astype(float) for corner in range(3)]
+        lower = np.array([
+            np.ceil(np.minimum(np.minimum(x[0], x[1]), x[2]) - 0.5).clip(0, self.width - 1),
+            np.ceil(np.minimum(np.minimum(y[0], y[1]), y[2]) - 0.5).clip(0, self.height - 1),
+        ]).astype(np.int64)
+        upper = np.array([
+            np.floor(np.maximum(np.maximum(x[0], x[1]), x[2]) - 0.5).clip(-1, self.width - 1),
+            np.floor(np.maximum(np.maximum(y[0], y[1]), y[2]) - 0.5).clip(-1, self.height - 1),
+        ]).astype(np.int64)
+
+        # Skips the triangles with no pixel center inside their bounding box
+        candidates = np.flatnonzero((lower[0] <= upper[0]) & (lower[1] <= upper[1]))
+        x, y = [corner[candidates] for corner in x], [corner[candidates] for corner in y]
+        lower, upper = lower[:, candidates], upper[:, candidates]
+
+        # Each weight is an edge function a * column + b * row + c, normalized by the triangle area
+        edges = [(1, 2), (2, 0), (0, 1)]
+        a = np.array([y[j] - y[k] for j, k in edges])
+        b = np.array([x[k] - x[j] for j, k in edges])
+        c = np.array([x[j] * y[k] - x[k] * y[j] for j, k in edges])
+        area = c.sum(axis=0)
+
+        # Skips the degenerate triangles, the weights are taken at the pixel centers
+        drawn = np.flatnonzero(area != 0)
+        a, b, c = a[:, drawn] / area[drawn], b[:, drawn] / area[drawn], (c + 0.5 * (a + b))[:, drawn] / area[drawn]
+        lower, upper, candidates = lower[:, drawn], upper[:, drawn], candidates[drawn]
+
+        # Walks the triangles rows, so the work grows with their height and covered pixels only
+        heights = upper[1] - lower[1] + 1
+        for triangles in self.__split(heights, max_samples):
+            row_triangles = np.repeat(triangles, heights[triangles])
+            rows = lower[1, row_triangles] + self.__get_offsets(heights[triangles])
+
+            # Columns range of each row where the three weights are positive
+            starts = lower[0, row_triangles].astype(float)
+            ends = upper[0, row_triangles].astype(float)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                for edge in range(3):
+                    edge_a = a[edge, row_triangles]
+                    edge_k = b[edge, row_triangles] * rows + c[edge, row_triangles]
+                    limit = -edge_k / edge_a
+                    starts = np.where(edge_a > 0, np.maximum(starts, np.ceil(limit)), starts)
+                    ends = np.where(edge_a < 0, np.minimum(ends, np.floor(limit)), ends)
+                    ends = np.where((edge_a == 0) & (edge_k < 0), -1, ends)
+            widths = np.maximum(ends - starts + 1, 0).astype(np.int64)
+            spans = np.flatnonzero(widths)
+
+            # Expands the rows spans into pixels
+            for span_chunk in self.__split(widths[spans], max_samples):
+                span_chunk = spans[span_chunk]
+                span_widths = widths[span_chunk]
+                pixel_triangles = np.repeat(row_triangles[span_chunk], span_widths)
+                pixel_rows = np.repeat(rows[span_chunk], span_widths)
+                pixel_columns = np.repeat(starts[span_chunk].astype(np.int64), span_widths)
+                pixel_columns += self.__get_offsets(span_widths)
+
+                weights = a[:, pixel_triangles] * pixel_columns + b[:, pixel_triangles] * pixel_rows
+                weights += c[:, pixel_triangles]
+                yield pixel_rows * self.width + pixel_columns, candidates[pixel_triangles], weights
+
+    def draw_segments(
+            self,
+            starts: np.ndarray,
+            ends: np.ndarray,
+            value: int = 255
+    ):
+        # Draws every segment (given in pixels as 2xN starts and ends) in a single vectorized pass
+        starts, ends = self.__clip_segments(starts, ends)
+        if starts.shape[1] == 0:
+            return self.image
+
+        # Samples each segment once per pixel along its longest direction
+        deltas = ends - starts
+        steps = np.ceil(np.abs(deltas).max(axis=0)).astype(np.int64) + 1
+        deltas /= np.maximum(steps - 1, 1)
+        segment_index = np.repeat(np.arange(steps.size), steps)
+        offsets = self.__get_offsets(steps)
+
+        columns = (starts[0, segment_index] + deltas[0, segment_index] * offsets).astype(np.int64)
+        rows = (starts[1, segment_index] + deltas[1, segment_index] * offsets).astype(np.int64)
+        np.clip(columns, 0, self.width - 1, out=columns)
+        np.clip(rows, 0, self.height - 1, out=rows)
+        rows *= self.width
+        rows += columns
+        self.image.reshape(-1)[rows] = value
+
+        return self.image
+
+    @staticmethod
+    def __get_offsets(counts: np.ndarray):
+        # Concatenated 0..count-1 ranges for each count
+        return np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    @staticmethod
+    def __split(counts: np.ndarray, limit: int):
+        # Yields index arrays of consecutive items whose counts add up to about the limit
+        cumulative = np.cumsum(counts)
+        boundaries = np.searchsorted(cumulative, np.arange(limit, cumulative[-1] if cumulative.size else 0, limit))
+        for chunk in np.split(np.arange(counts.size), np.unique(boundaries + 1)):
+            if chunk.size:
+                yield chunk
+
+    def __test_depth(self, pixel_indices: np.ndarray, face_indices: np.ndarray, inverse_depth: np.ndarray):
+        # Keeps the pixels nearer than anything drawn before them, and the face of each one
+        depth_buffer = self.inverse_depth.reshape(-1)
+        previous_inverse_depth = depth_buffer[pixel_indices]
+        np.maximum.at(depth_buffer, pixel_indices, inverse_depth)
+
+        nearest = (inverse_depth > previous_inverse_depth) & (inverse_depth == depth_buffer[pixel_indices])
+        return pixel_indices[nearest], face_indices[nearest]
+
+    def __get_visible_faces(self, faces: np.ndarray, visible: np.ndarray = None):
+        if visible is None:
+            return faces
+        return faces[np.all(visible[faces], axis=1)]
+
+    def __clip_segments(self, starts: np.ndarray, ends: np.ndarray):
+        # Clips the segments to the raster bounds (Liang-Barsky), dropping the ones fully outside
+        upper = np.array([[self.width - 1], [self.height - 1]])
+        outside = np.any(((starts < 0) & (ends < 0)) | ((starts > upper) & (ends > upper)), axis=0)
+        starts, ends = starts[:, ~outside], ends[:, ~outside]
+
+        # Only the segments crossing the raster bounds need to be clipped
+        crossing = np.flatnonzero(np.any((starts < 0) | (starts > upper) | (ends < 0) | (ends > upper), axis=0))
+        crossing_starts, crossing_ends = starts[:, crossing], ends[:, crossing]
+        deltas = crossing_ends - crossing_starts
+        t0 = np.zeros(crossing.size)
+        t1 = np.ones(crossing.size)
+        inside = np.ones(crossing.size, dtype=bool)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for dim in range(2):
+                for p, q in [(-deltas[dim], crossing_starts[dim]), (deltas[dim], upper[dim] - crossing_starts[dim])]:
+                    inside &= ~((p == 0) & (q < 0))
+                    r = q / p
+                    t0 = np.where(p < 0, np.maximum(t0, r), t0)
+                    t1 = np.where(p > 0, np.minimum(t1, r), t1)
+
+        inside &= t0 <= t1
+        starts[:, crossing] = crossing_starts + deltas * t0
+        ends[:, crossing] = crossing_starts + deltas * t1
+        kept = np.ones(starts.shape[1], dtype=bool)
+        kept[crossing[~inside]] = False
+        return starts[:, kept], ends[:, kept]
@@ -0,0 +1,191 @@
+import os
+
+import numpy as np
+
+from models.Actor import Actor
+from models.LevelOfDetail import LevelOfDetail
+
+
+class Scene:
+    def __init__(self, dtype: type = float):
+        # Meshes loaded by file, with their levels of detail. Every actor drawing a mesh shares it and
+        # only holds its own pose, so the memory grows with the unique meshes and not with the actors.
+        # The meshes are loaded at the precision, float32 halves their memory
+        self.dtype = dtype
+        self.meshes = {}
+        self.actors = []
+
+        # Level of detail every actor is drawn at, the ones with fewer levels use their most simplified one
+        self.level = 0
+
+        # Wireframe drawn at the world and camera views: 'polyline', the triangles one after the other,
+        # or 'edges', the unique edges of the meshes, only the feature ones when the feature angle is given
+        self.wireframe = 'polyline'
+        self.feature_angle = None
+
+        self.mesh_lines = []
+        self.__lines = {}
+        self.__edges = {}
+
+    def load_mesh(self, mesh_path: str):
+        # Loads the mesh levels once for each file
+        key = os.path.realpath(mesh_path)
+        if key not in self.meshes:
+            self.meshes[key] = LevelOfDetail.from_file(mesh_path, self.dtype)
+        return self.meshes[key]
+
+    def add_actor(self, mesh_path: str, coordinate: np.ndarray = None):
+        # Adds a new instance of the mesh
+        actor = Actor(mesh_path=mesh_path, coordinate=coordinate, levels=self.load_mesh(mesh_path))
+        self.actors.append(actor)
+        return actor
+
+    def add(self, actor: Actor):
+        # Adds an actor loaded on its own, the next instances of its mesh share it
+        self.meshes.setdefault(os.path.realpath(actor.mesh_path), actor.levels)
+        self.actors.append(actor)
+        return actor
+
+    def arrange(self, spacing: float = None):
+        # Lays the actors out on a square grid at the world xy plane starting at the origin, the cells
+        # are large enough for the largest mesh when the spacing isn't given
+        if spacing is None:
+            spacing = 1.5 * max(np.ptp(levels.meshes[0].vertices, axis=0).max() for levels in self.meshes.values())
+
+        columns = int(np.ceil(np.sqrt(len(self.actors))))
+        for index, actor in enumerate(self.actors):
+            pose = np.eye(4)
+            pose[0:2, 3] = np.array([index % columns, index // columns]) * spacing
+            actor.set_pose(pose)
+
+    def get_instances(self):
+        # Actors grouped by the mesh they share, in the order they were added. The instances of each
+        # mesh are projected and drawn together
+        instances = {}
+        for actor in self.actors:
+            instances.setdefault(id(actor.levels), []).append(actor)
+        return list(instances.values())
+
+    def set_level(self, level: int):
+        # Draws every actor at the level of detail, returns whether any of them has changed
+        self.level = level
+        changed = False
+        for actor in self.actors:
+            changed = actor.set_level(level) or changed
+        return changed
+
+    def choose_level(self, frame_times: dict, budget: float):
+        # Most detailed level whose frame time fits the budget (in seconds). The frame time of the levels not
+        # measured yet is scaled by the faces count from the nearest measured level, the simplest level is
+        # chosen while nothing has been measured
+        faces_counts = [
+            sum(actor.levels.meshes[min(level, len(actor.levels.meshes) - 1)].faces.shape[0] for actor in self.actors)
+            for level in range(max(len(actor.levels.meshes) for actor in self.actors))
+        ]
+        if not frame_times:
+            return len(faces_counts) - 1
+
+        for level, faces_count in enumerate(faces_counts):
+            measured_level = min(frame_times, key=lambda measured: abs(measured - level))
+            if frame_times[measured_level] * faces_count / max(faces_counts[measured_level], 1) <= budget:
+                return level
+        return len(faces_counts) - 1
+
+    def get_mesh_lines(self):
+        # One 3xM world polyline for each shared mesh, where NaN columns break the line between its
+        # instances. Each one is cached until the mesh or the pose of any of its instances changes
+        mesh_lines = []
+        lines = {}
+        for actors in self.get_instances():
+            meshes = [actor.mesh for actor in actors]
+            key = tuple((mesh, actor.pose_version) for actor, mesh in zip(actors, meshes))
+            if key not in self.__lines:
+                self.__lines[key] = self.__get_instances_line(actors, meshes)
+            lines[key] = self.__lines[key]
+            mesh_lines.append(lines[key])
+
+        # Only the lines of the current poses are kept
+        self.__lines = lines
+        return mesh_lines
+
+    def get_mesh_edges(self):
+        # One 3xM world line for each shared mesh with the edges of all its instances, each edge being its two
+        # ends followed by a NaN column. Drawn as a single line, it's drawn faster than as a collection of
+        # segments. Cached as the lines
+        mesh_edges = []
+        edges = {}
+        for actors in self.get_instances():
+            meshes = [actor.mesh for actor in actors]
+            key = tuple((mesh, actor.pose_version) for actor, mesh in zip(actors, meshes))
+            key += (self.feature_angle,)
+            if key not in self.__edges:
+                self.__edges[key] = self.__get_instances_edges(actors, meshes)
+            edges[key] = self.__edges[key]
+            mesh_edges.append(edges[key])
+
+        self.__edges = edges
+        return mesh_edges
+
+    def get_wireframe(self):
+        # World lines or edge segments of each shared mesh, as the wireframe is drawn
+        if self.wireframe == 'edges':
+            return self.get_mesh_edges()
+        return self.get_mesh_lines()
+
+    def get_bounds(self):
+        # Minimum and maximum world coordinates of every actor
+        bounds = np.array([bound for actor in self.actors for bound in actor.get_bounds()])
+        return bounds.min(axis=0), bounds.max(axis=0)
+
+    def draw(self, plot_axis, wireframe: list = None):
+        # Draws one line for the instances of each mesh, the current wireframe unless one is given
+        if wireframe is None:
+            wireframe = self.get_wireframe()
+        self.mesh_lines = [
+            plot_axis.plot(mesh_line[0, :], mesh_line[1, :], mesh_line[2, :], 'b')[0]
+            for mesh_line in wireframe
+        ]
+
+    def redraw(self, plot_axis, wireframe: list = None):
+        # Moves the drawn lines in place
+        if wireframe is None:
+            wireframe = self.get_wireframe()
+        for line, mesh_line in zip(self.mesh_lines, wireframe):
+            line.set_data_3d(mesh_line[0, :], mesh_line[1, :], mesh_line[2, :])
+
+    def __get_instances_line(self, actors: list, meshes: list):
+        # Moves the triangles of every instance to the world at once. The instances are drawn at the same
+        # level, unless it's being changed (from another thread) meanwhile, then they're moved one by one
+        if any(mesh is not meshes[0] for mesh in meshes):
+            return np.concatenate([
+                np.concatenate([
+                    actor.to_world(mesh.vertices[mesh.indices]).T,
+                    np.full([3, 1], np.nan, dtype=mesh.vertices.dtype)
+                ], axis=1)
+                for actor, mesh in zip(actors, meshes)
+            ], axis=1)[:, :-1]
+
+        model_points = meshes[0].vertices[meshes[0].indices]
+        poses = np.array([actor.pose for actor in actors], dtype=model_points.dtype)
+        world_points = np.full([len(actors), model_points.shape[0] + 1, 3], np.nan, dtype=model_points.dtype)
+        world_points[:, :-1] = np.matmul(model_points, poses[:, 0:3, 0:3].transpose(0, 2, 1))
+        world_points[:, :-1] += poses[:, np.newaxis, 0:3, 3]
+        return world_points.reshape(-1, 3)[:-1].T
+
+    def __get_instances_edges(self, actors: list, meshes: list):
+        # Moves the edges of every instance to the world at once, one by one while the level is being changed
+        if any(mesh is not meshes[0] for mesh in meshes):
+            segments = np.concatenate([
+                actor.to_world(mesh.vertices)[mesh.get_edges(self.feature_angle)]
+                for actor, mesh in zip(actors, meshes)
+            ])
+        else:
+            mesh = meshes[0]
+            poses = np.array([actor.pose for actor in actors], dtype=mesh.vertices.dtype)
+            world_vertices = np.matmul(mesh.vertices, poses[:, 0:3, 0:3].transpose(0, 2, 1))
+            world_vertices += poses[:, np.newaxis, 0:3, 3]
+            segments = world_vertices[:, mesh.get_edges(self.feature_angle)].reshape(-1, 2, 3)
+
+        edges_line = np.full([segments.shape[0], 3, 3], np.nan, dtype=segments.dtype)
+        edges_line[:, 0:2] = segments
+        return edges_line.reshape(-1, 3)[:-1].T
@@ -0,0 +1,95 @@
+import os
+
+import numpy as np
+
+# Layout of the binary STL file: 80 bytes header, triangles count and the triangles records
+HEADER_SIZE = 84
+RECORD_DTYPE = np.dtype([
+    ('normal', '<f4', (3,)),
+    ('vertices', '<f4', (3, 3)),
+    ('attribute', '<u2'),
+])
+
+
+class StlLoader:
+    def __init__(self, mesh_path: str):
+        self.mesh_path = mesh_path
+
+    def is_binary(self):
+        # A binary STL size is given by its triangles count, ASCII files may be told by it as well
+        file_size = os.path.getsize(self.mesh_path)
+        if file_size < HEADER_SIZE:
+            return False
+
+        triangles_count = int(np.fromfile(self.mesh_path, dtype='<u4', count=1, offset=80)[0])
+        return file_size == HEADER_SIZE + triangles_count * RECORD_DTYPE.itemsize
+
+    def load(self, dtype: type = float):
+        # Returns the deduplicated (N, 3) vertices, the (F, 3) faces indices and the (F, 3) unit normals,
+        # the vertices and normals at the given floating point precision
+        if self.is_binary():
+            records = np.memmap(self.mesh_path, dtype=RECORD_DTYPE, mode='r', offset=HEADER_SIZE)
+            triangles, normals = records['vertices'], records['normal']
+        else:
+            # ASCII files are parsed by numpy-stl
+            from stl import mesh
+            object_mesh = mesh.Mesh.from_file(self.mesh_path)
+            triangles, normals = object_mesh.vectors, object_mesh.normals
+
+        vertices, faces = self.deduplicate(triangles, dtype)
+        return vertices, faces, self.get_unit_normals(triangles, normals, dtype)
+
+    @staticmethod
+    def get_unit_normals(triangles: np.ndarray, normals: np.ndarray, dtype: type = float):
+        # Normalizes the (F, 3) normals of the (F, 3, 3) triangles, the ones missing at the file
+        # (zero) are given by the triangles winding
+        normals = np.array(normals, dtype=dtype)
+        lengths = np.sqrt(np.einsum('ij,ij->i', normals, normals))
+        missing = np.flatnonzero(lengths == 0)
+        if missing.size:
+            corners = np.asarray(triangles[missing], dtype=dtype)
+            missing_normals = np.cross(corners[:, 1] - corners[:, 0], corners[:, 2] - corners[:, 0])
+            normals[missing] = missing_normals
+            lengths[missing] = np.sqrt(np.einsum('ij,ij->i', missing_normals, missing_normals))
+
+        lengths[lengths == 0] = 1
+        normals /= lengths[:, np.newaxis]
+        return normals
+
+    @staticmethod
+    def deduplicate(triangles: np.ndarray, dtype: type = float):
+        # Merges the vertices shared by the (F, 3, 3) triangles into an indexed representation
+        points = np.array(triangles, dtype=np.float32).reshape(-1, 3)
+        if points.shape[0] == 0:
+            # A file without triangles has no vertices
+            return np.zeros([0, 3], dtype=dtype), np.zeros([0, 3], dtype=np.uint32)
+
+        # Avoids -0.0 and 0.0 being told apart, then sorts the points by a hash of their bits
+        points += np.float32(0)
+        bits = points.view(np.uint32)
+        hashes = (bits[:, 0].astype(np.uint64) << np.uint64(32)) | bits[:, 1]
+        hashes ^= bits[:, 2].astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        order = np.argsort(hashes)
+
+        # Each run of equal hashes is a single vertex, unless two different points collided
+        hashes = hashes[order]
+        first = np.empty(order.size, dtype=bool)
+        first[0:1] = True
+        np.not_equal(hashes[1:], hashes[:-1], out=first[1:])
+        del hashes
+
+        collided = np.zeros(order.size - 1, dtype=bool)
+        for dim in range(3):
+            sorted_bits = bits[order, dim]
+            collided |= sorted_bits[1:] != sorted_bits[:-1]
+        if np.any(collided & ~first[1:]):
+            keys = points.view(np.dtype((np.void, points.dtype.itemsize * 3))).ravel()
+            _, first_index, faces = np.unique(keys, return_index=True, return_inverse=True)
+            return points[first_index].astype(dtype, copy=False), faces.reshape(-1, 3).astype(np.uint32)
+
+        index_dtype = np.uint32 if order.size < 2 ** 32 else np.uint64
+        faces = np.empty(order.size, dtype=index_dtype)
+        faces[order] = np.cumsum(first) - 1
+        vertices = points[order[first]].astype(dtype, copy=False)
+
+        return vertices, faces.reshape(-1, 3)
@@ -0,0 +1,147 @@
+import numpy as np
+
+from models.Pose import Pose
+
+# Columns of a trajectory given as a table, the camera parameters columns are optional
+POSE_COLUMNS = [
+    'actor_x', 'actor_y', 'actor_z', 'actor_rx', 'actor_ry', 'actor_rz',
+    'camera_x', 'camera_y', 'camera_z', 'camera_rx', 'camera_ry', 'camera_rz',
+]
+CAMERA_PARAMS_COLUMNS = ['f', 'sx', 'sy', 'so', 'ox', 'oy']
+
+
+class Trajectory:
+    def __init__(
+            self,
+            actor_matrices: np.ndarray,
+            camera_matrices: np.ndarray,
+            camera_params: np.ndarray = None
+    ):
+        # Stacked (F, 4, 4) movement matrices of the actor and the camera for every frame
+        self.actor_matrices = np.asarray(actor_matrices, dtype=float)
+        self.camera_matrices = np.asarray(camera_matrices, dtype=float)
+
+        # Optional (F, 6) camera parameters, in the CAMERA_PARAMS_COLUMNS order
+        if camera_params is not None:
+            camera_params = np.asarray(camera_params, dtype=float)
+        self.camera_params = camera_params
+
+    def __len__(self):
+        return self.actor_matrices.shape[0]
+
+    @classmethod
+    def from_file(cls, path: str):
+        if path.endswith('.npy'):
+            return cls.from_array(np.load(path))
+        return cls.from_csv(path)
+
+    @classmethod
+    def from_csv(cls, path: str):
+        # Reads a table with a header naming the POSE_COLUMNS and, optionally, the CAMERA_PARAMS_COLUMNS
+        table = np.genfromtxt(path, delimiter=',', names=True)
+        table = np.atleast_1d(table)
+        columns = POSE_COLUMNS
+        if all(name in table.dtype.names for name in CAMERA_PARAMS_COLUMNS):
+            columns = POSE_COLUMNS + CAMERA_PARAMS_COLUMNS
+
+        return cls.from_array(np.array([table[name] for name in columns]).T)
+
+    @classmethod
+    def from_array(cls, array: np.ndarray):
+        # Accepts (F, 2, 4, 4) actor and camera movement matrices or
+        # (F, 12 or 18) rows in the POSE_COLUMNS (+ CAMERA_PARAMS_COLUMNS) order
+        array = np.asarray(array, dtype=float)
+        if array.ndim == 4:
+            return cls(array[:, 0], array[:, 1])
+
+        camera_params = None
+        if array.shape[1] == len(POSE_COLUMNS) + len(CAMERA_PARAMS_COLUMNS):
+            camera_params = array[:, 12:18]
+
+        return cls(
+            actor_matrices=cls.get_movement_matrices(array[:, 0:3], array[:, 3:6]),
+            camera_matrices=cls.get_movement_matrices(array[:, 6:9], array[:, 9:12]),
+            camera_params=camera_params
+        )
+
+    def interpolate(self, steps: int):
+        # Trajectory with the given steps from each frame to the next one, for a smooth animation: the poses
+        # are interpolated along the shortest arc (slerp) and the camera parameters linearly. The frames
+        # of this trajectory are kept as they are
+        if steps < 1:
+            raise ValueError('interpolation steps must be at least 1, got {}'.format(steps))
+        fractions = np.arange(steps) / steps
+
+        def interpolate_matrices(matrices: np.ndarray):
+            poses = Pose.from_matrix(matrices)
+            starts = Pose(poses.quaternions[:-1, np.newaxis], poses.translations[:-1, np.newaxis])
+            ends = Pose(poses.quaternions[1:, np.newaxis], poses.translations[1:, np.newaxis])
+            interpolated_matrices = starts.interpolate(ends, fractions).to_matrix()
+            interpolated_matrices[:, 0] = matrices[:-1]
+            return np.concatenate([interpolated_matrices.reshape(-1, 4, 4), matrices[-1:]])
+
+        camera_params = None
+        if self.camera_params is not None:
+            camera_params = (
+                self.camera_params[:-1, np.newaxis] * (1 - fractions[:, np.newaxis])
+                + self.camera_params[1:, np.newaxis] * fractions[:, np.newaxis]
+            )
+            camera_params = np.concatenate([camera_params.reshape(-1, self.camera_params.shape[1]),
+                                            self.camera_params[-1:]])
+
+        return Trajectory(
+            interpolate_matrices(self.actor_matrices),
+            interpolate_matrices(self.camera_matrices),
+            camera_params
+        )
+
+    @staticmethod
+    def get_movement_matrices(
+            target_points: np.ndarray,
+            rotation_angles: np.ndarray
+    ):
+        # Builds the (F, 4, 4) matrices that rotate the object at its own axis, around x, y and
+        # then z (angles in degrees), and moves it to the target point
+        movement_matrices = np.zeros([target_points.shape[0], 4, 4])
+        movement_matrices[:, 3, 3] = 1
+        movement_matrices[:, 0:3, 3] = target_points
+        movement_matrices[:, 0:3, 0:3] = np.matmul(
+            Trajectory.get_rotation_matrices(rotation_angles[:, 2], 'z'),
+            np.matmul(
+                Trajectory.get_rotation_matrices(rotation_angles[:, 1], 'y'),
+                Trajectory.get_rotation_matrices(rotation_angles[:, 0], 'x')
+            )
+        )
+
+        return movement_matrices
+
+    @staticmethod
+    def get_rotation_matrices(
+            rotation_angles: np.ndarray,
+            rotation_axis: str
+    ):
+        # Stacked version of MainController.get_rotation_matrix, with the same conventions
+        radians = np.pi * rotation_angles / 180
+        cos, sin = np.cos(radians), np.sin(radians)
+        rotation_matrices = np.zeros([radians.size, 3, 3])
+
+        if rotation_axis == 'x':
+            rotation_matrices[:, 0, 0] = 1
+            rotation_matrices[:, 1, 1] = cos
+            rotation_matrices[:, 1, 2] = -sin
+            rotation_matrices[:, 2, 1] = sin
+            rotation_matrices[:, 2, 2] = cos
+        elif rotation_axis == 'y':
+            rotation_matrices[:, 0, 0] = cos
+            rotation_matrices[:, 0, 2] = -sin
+            rotation_matrices[:, 1, 1] = 1
+            rotation_matrices[:, 2, 0] = sin
+            rotation_matrices[:, 2, 2] = cos
+        else:
+            rotation_matrices[:, 0, 0] = cos
+            rotation_matrices[:, 0, 1] = -sin
+            rotation_matrices[:, 1, 0] = sin
+            rotation_matrices[:, 1, 1] = cos
+            rotation_matrices[:, 2, 2] = 1
+
+        return rotation_matrices
@@ -0,0 +1,175 @@
+import argparse
+import contextlib
+import json
+import os
+import sys
+
+import numpy as np
+
+from controllers.RenderController import RenderController
+from models.Actor import Actor
+from models.Camera import Camera
+from models.FrameExporter import FrameExporter, VIDEO_CODECS, QUEUE_SIZE
+from models.Trajectory import Trajectory
+
+# Same initial camera pose and focal length set by the main view controls
+DEFAULT_CAMERA_POSE = {
+    'target_coordinate': [0, 50, -50],
+    'rotation_angle': 90,
+    'rotation_axis': 'x',
+    'reference_axis': 'world'
+}
+DEFAULT_CAMERA_PARAMS = {'f': 5}
+
+
+def positive_int(value: str):
+    # Argument type of the counts that must be at least 1
+    count = int(value)
+    if count < 1:
+        raise argparse.ArgumentTypeError('must be at least 1, got {}'.format(count))
+    return count
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Renders the camera view of an actor for a list of poses.')
+    parser.add_argument('mesh_path', help='path of the actor STL file')
+    parser.add_argument('--poses', help='JSON file with a list of frames, each with optional '
+                                        '"actor", "camera" and "camera_params" entries')
+    parser.add_argument('--trajectory', help='CSV or NumPy file with the actor and camera poses of every frame, '
+                                             'as described at models/Trajectory.py')
+    parser.add_argument('--interpolate', type=positive_int, default=1,
+                        help='frames from each trajectory frame to the next one, the poses are interpolated')
+    parser.add_argument('--workers', type=int, help='projects the trajectory frames with a pool of this many processes')
+    parser.add_argument('--rig', help='JSON file with a list of cameras, each with optional "camera" and '
+                                      '"camera_params" entries, all of them rendered at every frame')
+    parser.add_argument('--output', default='output', help='directory where the frames are written')
+    parser.add_argument('--format', default='png', help='"npy" for the projected points or an image extension')
+    parser.add_argument('--video', help='video file ({}) the images are encoded to instead of the output directory, '
+                                        'one for each rig camera'.format(', '.join(VIDEO_CODECS)))
+    parser.add_argument('--fps', type=float, default=30, help='frame rate of the video')
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE,
+                        help='frames rendered ahead of the writer thread, at most')
+    parser.add_argument('--width', type=int, default=640)
+    parser.add_argument('--height', type=int, default=640)
+    parser.add_argument('--extent', type=float, default=10, help='half size of the rendered image plane window')
+    parser.add_argument('--precision', choices=['float64', 'float32'], default='float64',
+                        help='floating point type the mesh is loaded, moved and projected at')
+    parser.add_argument('--trace', help='Chrome trace JSON file the render stages spans are written to')
+    args = parser.parse_args(argv)
+    if args.video is not None and os.path.splitext(args.video)[1].lower() not in VIDEO_CODECS:
+        parser.error('--video must end in one of {}'.format(', '.join(VIDEO_CODECS)))
+    if args.video is not None and args.format == 'npy':
+        parser.error('--video encodes the images, not the npy projected points')
+    return args
+
+
+def load_frames(poses_path: str = None):
+    if poses_path is None:
+        return [{}]
+
+    with open(poses_path) as poses_file:
+        return json.load(poses_file)
+
+
+def main(argv):
+    args = parse_args(argv)
+
+    # Setup the headless renderer
+    controller = RenderController(
+        actor=Actor(mesh_path=args.mesh_path, dtype=np.dtype(args.precision).type),
+        camera=Camera(),
+        width=args.width,
+        height=args.height,
+        extent=args.extent
+    )
+    controller.set_pose(camera_pose=DEFAULT_CAMERA_POSE, camera_params=DEFAULT_CAMERA_PARAMS)
+    controller.profiler.enabled = args.trace is not None
+
+    if args.trajectory is not None:
+        render_trajectory(controller, Trajectory.from_file(args.trajectory).interpolate(args.interpolate), args)
+    elif args.rig is not None:
+        render_rig(controller, load_frames(args.rig), load_frames(args.poses), args)
+    else:
+        render_frames(controller, load_frames(args.poses), args)
+
+    if args.trace is not None:
+        controller.profiler.export_trace(args.trace)
+    return 0
+
+
+def open_exporter(args, camera_index: int = None):
+    # Writer of the frames (of a rig camera) to the video, or to the output directory one file per frame
+    suffix = '' if camera_index is None else '_camera_{:02d}'.format(camera_index)
+    if args.video is not None:
+        root, extension = os.path.splitext(args.video)
+        return FrameExporter(root + suffix + extension, fps=args.fps, queue_size=args.queue_size)
+    return FrameExporter(args.output, 'frame_{:05d}' + suffix + '.' + args.format, queue_size=args.queue_size)
+
+
+def print_export_stats(exporter: FrameExporter):
+    stats = exporter.stats
+    print('{} frames written to {} in {:.3f}s, rendering waited {:.3f}s for the writer'.format(
+        stats['frames'], exporter.output_path, stats['seconds'], stats['wait_seconds']
+    ), file=sys.stderr)
+
+
+def render_frames(controller: RenderController, frames: list, args):
+    # Writes the camera view (or the projected points) of each frame
+    with open_exporter(args) as exporter:
+        for frame in frames:
+            pose = {
+                'actor_pose': frame.get('actor'),
+                'camera_pose': frame.get('camera'),
+                'camera_params': frame.get('camera_params')
+            }
+
+            if args.format == 'npy':
+                projected_actor, _ = controller.render_points(**pose)
+                exporter.write(projected_actor)
+            else:
+                # The exporter copies the raster image, so it's drawn again at the next frame
+                controller.set_pose(**pose)
+                exporter.write(controller.draw_camera_image(controller.raster))
+    print_export_stats(exporter)
+
+
+def render_rig(controller: RenderController, cameras: list, frames: list, args):
+    # Writes the image of every rig camera at each frame, only the actor pose of the frames is used
+    controller.set_rig_cameras(cameras)
+    with contextlib.ExitStack() as exit_stack:
+        exporters = [exit_stack.enter_context(open_exporter(args, index)) for index in range(len(cameras))]
+        for frame in frames:
+            for exporter, image in zip(exporters, controller.render_rig_images(frame.get('actor'))):
+                exporter.write(image)
+    for exporter in exporters:
+        print_export_stats(exporter)
+
+    for camera_index, stats in enumerate(controller.rig_stats):
+        print('camera {}: {} frames in {:.3f}s ({:.1f} fps)'.format(camera_index, stats['frames'], stats['seconds'],
+                                                                    stats['fps']), file=sys.stderr)
+
+
+def render_trajectory(controller: RenderController, trajectory: Trajectory, args):
+    if args.workers is None:
+        frames = controller.render_trajectory(trajectory)
+    else:
+        frames = controller.render_trajectory_parallel(trajectory, workers=args.workers)
+
+    # The frames hold the projected vertices of each triangle, one after the other. They're projected as they're
+    # written, so only the frames queued for the writer are held
+    faces = np.arange(controller.actor.mesh.indices.size).reshape(-1, 3)
+    with open_exporter(args) as exporter:
+        for projected_actor, visible in frames:
+            if args.format == 'npy':
+                exporter.write(projected_actor)
+            else:
+                exporter.write(controller.draw_camera_image(controller.raster, projected_actor, visible, faces))
+    print_export_stats(exporter)
+
+    stats = controller.trajectory_stats
+    print('{} frames projected in {:.3f}s ({:.1f} fps)'.format(stats['frames'], stats['seconds'], stats['fps']),
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tests import the models and controllers as the scripts at the repository root do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
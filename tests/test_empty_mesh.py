@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from controllers.RenderController import RenderController
+from models.Actor import Actor
+from models.Camera import Camera
+from render import DEFAULT_CAMERA_POSE, DEFAULT_CAMERA_PARAMS
+
+
+@pytest.fixture
+def empty_mesh_path(tmp_path):
+    # Binary STL with its 80 bytes header and no triangles
+    mesh_path = tmp_path / 'empty.stl'
+    mesh_path.write_bytes(bytes(80) + np.uint32(0).tobytes())
+    return str(mesh_path)
+
+
+@pytest.mark.parametrize('dtype', [np.float64, np.float32])
+def test_empty_mesh_actor(empty_mesh_path, dtype):
+    actor = Actor(mesh_path=empty_mesh_path, dtype=dtype)
+    assert actor.mesh.vertices.shape == (0, 3)
+    assert actor.mesh.faces.shape == (0, 3)
+
+    # An actor without vertices is bounded by its axis
+    bounds_min, bounds_max = actor.get_bounds()
+    axis_min, axis_max = actor.axis.get_bounds()
+    assert np.array_equal(bounds_min, axis_min) and np.array_equal(bounds_max, axis_max)
+
+    controller = RenderController(actor=actor, camera=Camera())
+    controller.set_pose(
+        actor_pose={'target_coordinate': [3, -2, 5]},
+        camera_pose=DEFAULT_CAMERA_POSE,
+        camera_params=DEFAULT_CAMERA_PARAMS
+    )
+    assert np.isfinite(controller.scene.get_bounds()).all()
+    assert controller.scene.choose_level({0: 0.01}, 0.03) == 0
+
+    projected, visible = controller.render_points()
+    assert projected.shape == (2, 0) and visible.shape == (0,)
+    assert not controller.render_image().any()
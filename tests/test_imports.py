@@ -0,0 +1,11 @@
+from benchmark import CORE_MODULES, IMPORT_BUDGET, measure_imports
+
+
+def test_core_imports_are_lazy_and_fast():
+    # Each core module is imported at a fresh interpreter, the median of a few runs is held to the budget
+    imports = measure_imports(repeats=3)
+
+    assert list(imports) == CORE_MODULES
+    for module, timing in imports.items():
+        assert timing['packages'] == [], '{} imports {}'.format(module, ', '.join(timing['packages']))
+        assert timing['seconds'] < IMPORT_BUDGET, '{} imports in {:.3f}s'.format(module, timing['seconds'])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from models.Pose import Pose
+from models.Trajectory import Trajectory
+from render import parse_args
+
+
+def get_random_poses(seed: int, count: int = 50):
+    rng = np.random.default_rng(seed)
+    return Pose.from_axis_angle(rng.normal(size=(count, 3)), rng.uniform(-360, 360, count), rng.normal(size=(count, 3)))
+
+
+def test_matrix_round_trip_is_exact():
+    matrices = get_random_poses(0).to_matrix()
+    poses = Pose.from_matrix(matrices)
+
+    assert np.array_equal(poses.to_matrix(), matrices)
+    assert np.array_equal(poses[3].to_matrix(), matrices[3])
+    assert np.array_equal(Pose.from_matrix(poses.to_matrix()).to_matrix(), matrices)
+
+    # The kept matrices are a copy, changing the given or the returned ones doesn't change the poses
+    matrices_copy = matrices.copy()
+    matrices[:] = 0
+    poses.to_matrix()[:] = 0
+    assert np.array_equal(poses.to_matrix(), matrices_copy)
+
+
+def test_matrix_rebuilt_from_quaternions():
+    # Once the fields are replaced, the matrices are built from the quaternions and translations again
+    matrices = get_random_poses(1).to_matrix()
+    poses = Pose.from_matrix(matrices)
+    poses.translations = np.zeros([len(poses), 3])
+
+    assert not poses.to_matrix()[:, 0:3, 3].any()
+    np.testing.assert_allclose(poses.to_matrix()[:, 0:3, 0:3], matrices[:, 0:3, 0:3], atol=1e-12)
+    with pytest.raises(ValueError):
+        poses.quaternions[0, 0] = 2
+
+
+def test_single_pose_has_no_length():
+    with pytest.raises(TypeError):
+        len(Pose.identity())
+    assert len(Pose.identity(3)) == 3
+
+
+def test_interpolate_steps():
+    poses = get_random_poses(2, count=4)
+    trajectory = Trajectory(poses.to_matrix(), poses.invert().to_matrix())
+
+    assert np.array_equal(trajectory.interpolate(1).actor_matrices, trajectory.actor_matrices)
+    interpolated = trajectory.interpolate(3)
+    assert interpolated.actor_matrices.shape == (10, 4, 4)
+    assert np.array_equal(interpolated.actor_matrices[::3], trajectory.actor_matrices)
+    with pytest.raises(ValueError):
+        trajectory.interpolate(0)
+    with pytest.raises(SystemExit):
+        parse_args(['mesh.stl', '--interpolate', '0'])
@@ -0,0 +1,51 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from controllers.RenderController import RenderController
+from models.Actor import Actor
+from models.Camera import Camera
+from render import DEFAULT_CAMERA_POSE, DEFAULT_CAMERA_PARAMS
+
+MESH_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'public', 'stl', 'link.STL')
+
+ACTOR_POSES = [
+    None,
+    {'target_coordinate': [3, -2, 5], 'rotation_angle': 35, 'rotation_axis': 'y', 'reference_axis': 'actor'},
+]
+
+
+@pytest.fixture(scope='module')
+def controllers(tmp_path_factory):
+    # The mesh is copied, so its preprocessed cache is written away from the repository
+    mesh_path = str(tmp_path_factory.mktemp('mesh') / 'link.STL')
+    shutil.copyfile(MESH_PATH, mesh_path)
+
+    controllers = {}
+    for dtype in (np.float64, np.float32):
+        controller = RenderController(actor=Actor(mesh_path=mesh_path, dtype=dtype), camera=Camera())
+        controller.set_pose(camera_pose=DEFAULT_CAMERA_POSE, camera_params=DEFAULT_CAMERA_PARAMS)
+        controllers[dtype] = controller
+    return controllers
+
+
+@pytest.mark.parametrize('actor_pose', ACTOR_POSES)
+def test_float32_projection_matches_float64(controllers, actor_pose):
+    projected, visible = controllers[np.float64].render_points(actor_pose=actor_pose)
+    projected_32, visible_32 = controllers[np.float32].render_points(actor_pose=actor_pose)
+
+    assert projected_32.dtype == np.float32
+    assert np.array_equal(visible, visible_32)
+    relative_error = np.abs(projected_32 - projected)[:, visible].max() / np.abs(projected[:, visible]).max()
+    assert relative_error < 1e-6
+
+
+@pytest.mark.parametrize('actor_pose', ACTOR_POSES)
+def test_float32_image_matches_float64(controllers, actor_pose):
+    image = controllers[np.float64].render_image(actor_pose=actor_pose)
+    image_32 = controllers[np.float32].render_image(actor_pose=actor_pose)
+
+    assert image.any()
+    assert np.abs(image_32.astype(int) - image).max() <= 1
@@ -0,0 +1,59 @@
+import numpy as np
+
+from controllers.RenderController import RenderController
+from models.Actor import Actor
+from models.Camera import Camera
+from models.LevelOfDetail import LevelOfDetail
+from models.Mesh import Mesh
+
+
+def get_random_actor(seed: int, faces_count: int = 500):
+    # Random triangles spread around the camera, some of their vertices in front of it and some behind
+    rng = np.random.default_rng(seed)
+    vertices = rng.uniform(-60, 60, size=(3 * faces_count, 3))
+    faces = np.arange(3 * faces_count, dtype=np.uint32).reshape(-1, 3)
+    normals = np.cross(vertices[faces[:, 1]] - vertices[faces[:, 0]], vertices[faces[:, 2]] - vertices[faces[:, 0]])
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+    return Actor(mesh_path='random_{}.stl'.format(seed), levels=LevelOfDetail([Mesh(vertices, faces, normals)]))
+
+
+def project_by_loop(camera: Camera, actor: Actor):
+    # The per vertex projection the batched one replaced, every vertex in front of the near plane is moved to
+    # the camera reference frame and projected on its own
+    intrinsic_parameter_matrix = camera.get_intrinsic_parameter_matrix()
+    projection_matrix = np.zeros([3, 4])
+    projection_matrix[0:3, 0:3] = np.eye(3)
+
+    projected_actor = np.zeros([2, actor.mesh_matrix.shape[1]])
+    visible = np.zeros(actor.mesh_matrix.shape[1], dtype=bool)
+    for index in range(projected_actor.shape[1]):
+        point_coordinate = np.ones(4)
+        point_coordinate[0:3] = actor.mesh_matrix[0:3, index] - camera.axis.coordinate
+        point_coordinate[0:3] = np.dot(camera.axis.base, point_coordinate[0:3].T)
+        z = point_coordinate[2]
+        if z <= camera.projector.near:
+            continue
+
+        projected_point = np.linalg.multi_dot([intrinsic_parameter_matrix, projection_matrix, point_coordinate.T])
+        projected_actor[:, index] = projected_point[0:2] / z
+        visible[index] = True
+
+    return projected_actor, visible
+
+
+def test_batched_projection_matches_loop():
+    for seed in range(3):
+        controller = RenderController(actor=get_random_actor(seed), camera=Camera())
+        controller.set_pose(
+            actor_pose={'target_coordinate': [3, -2, 5], 'rotation_angle': 35, 'rotation_axis': 'y'},
+            camera_pose={'target_coordinate': [0, 10, -20], 'rotation_angle': 30 * seed, 'rotation_axis': 'x'},
+            camera_params={'f': 2 + seed, 'sx': 1.5, 'sy': 0.8, 'so': 0.1, 'ox': 1, 'oy': -2}
+        )
+
+        projected, visible = controller.render_points()
+        expected, expected_visible = project_by_loop(controller.camera, controller.actor)
+
+        assert expected_visible.any() and not expected_visible.all()
+        assert np.array_equal(visible, expected_visible)
+        np.testing.assert_allclose(projected[:, visible], expected[:, visible], rtol=1e-10, atol=1e-10)
+        assert not projected[:, ~visible].any()
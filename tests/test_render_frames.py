@@ -0,0 +1,93 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from controllers.MainController import MainController
+from models.Actor import Actor
+from models.Camera import Camera
+from render import DEFAULT_CAMERA_POSE, DEFAULT_CAMERA_PARAMS
+
+MESH_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'public', 'stl', 'link.STL')
+
+
+@pytest.fixture
+def controller(tmp_path):
+    # The mesh is copied, so its preprocessed cache is written away from the repository
+    mesh_path = str(tmp_path / 'link.STL')
+    shutil.copyfile(MESH_PATH, mesh_path)
+
+    controller = MainController(actor=Actor(mesh_path=mesh_path), camera=Camera())
+    controller.move_camera(**DEFAULT_CAMERA_POSE)
+    controller.update_camera_params(**DEFAULT_CAMERA_PARAMS)
+    return controller
+
+
+@pytest.fixture
+def plot_axes():
+    # World and camera view axes at a headless figure, as the benchmark draws them
+    figure = Figure(figsize=(10, 5), dpi=100)
+    FigureCanvasAgg(figure)
+    return figure.add_subplot(1, 2, 1, projection='3d'), figure.add_subplot(1, 2, 2)
+
+
+def move_actor(controller: MainController, target_coordinate: list):
+    # Moves the actor without rotating it, as the actor controls do
+    controller.move_actor(
+        target_coordinate=np.array(target_coordinate),
+        rotation_angle=0,
+        rotation_axis='z',
+        reference_axis='world'
+    )
+
+
+def draw_frame(controller: MainController, plot_axes: tuple, frame: dict):
+    # Draws the prepared frame the way the main view does, returns whether another one must be prepared
+    world_axis, camera_axis = plot_axes
+    controller.draw_world_components(plot_axis=world_axis, frame=frame)
+    controller.draw_camera_view(plot_axis=camera_axis, frame=frame)
+    controller.draw_camera_grid(frame)
+    return controller.finish_frame(frame)
+
+
+def test_update_during_prepared_frame_shows_latest_image(controller, plot_axes):
+    draw_frame(controller, plot_axes, controller.prepare_frame())
+    first_image = controller.camera_image.copy()
+
+    # The actor is moved (at the GUI thread) while the frame is prepared, after its camera image is drawn
+    draw_camera_image = controller.draw_camera_image
+
+    def draw_camera_image_then_move(raster):
+        image = draw_camera_image(raster)
+        controller.draw_camera_image = draw_camera_image
+        move_actor(controller, [5, 0, 3])
+        return image
+
+    move_actor(controller, [-5, 0, 0])
+    controller.draw_camera_image = draw_camera_image_then_move
+    stale_frame = controller.prepare_frame()
+
+    # The stale frame is drawn, its views are dirty again and the next frame shows the latest actor pose
+    assert draw_frame(controller, plot_axes, stale_frame)
+    assert all(controller.dirty[view] for view in ('world', 'camera_view', 'camera_grid'))
+    assert not draw_frame(controller, plot_axes, controller.prepare_frame())
+    assert not any(controller.dirty.values())
+
+    latest_image = controller.draw_camera_image(controller.raster).copy()
+    assert not np.array_equal(latest_image, first_image)
+    assert np.array_equal(controller.camera_image, latest_image)
+
+
+def test_frame_only_clears_prepared_components(controller, plot_axes):
+    draw_frame(controller, plot_axes, controller.prepare_frame())
+    controller.update_camera_params(**dict(DEFAULT_CAMERA_PARAMS, f=6))
+    frame = controller.prepare_frame()
+
+    # A change marked once the frame took its components waits for the next frame
+    move_actor(controller, [5, 0, 3])
+    assert frame['dirty']['camera_view'] == {'camera_params'}
+    assert draw_frame(controller, plot_axes, frame)
+    assert 'actor' in controller.dirty['world'] and 'actor' in controller.dirty['camera_view']
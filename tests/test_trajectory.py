@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pytest
+
+from controllers.RenderController import RenderController
+from models.Actor import Actor
+from models.Camera import Camera
+from models.Pose import Pose
+from models.Trajectory import Trajectory
+from render import DEFAULT_CAMERA_POSE, DEFAULT_CAMERA_PARAMS
+
+MESH_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'public', 'stl', 'link.STL')
+
+
+@pytest.fixture(scope='module')
+def controller():
+    controller = RenderController(actor=Actor(mesh_path=MESH_PATH), camera=Camera())
+    controller.set_pose(camera_pose=DEFAULT_CAMERA_POSE, camera_params=DEFAULT_CAMERA_PARAMS)
+    return controller
+
+
+@pytest.fixture(scope='module')
+def trajectory(controller):
+    # The actor turns and moves away from the camera while the focal length grows
+    frames_count = 30
+    angles = np.linspace(0, 90, frames_count)
+    translations = np.zeros([frames_count, 3])
+    translations[:, 2] = np.linspace(0, 20, frames_count)
+    camera_params = np.zeros([frames_count, 6])
+    camera_params[:, 0:3] = 1
+    camera_params[:, 0] = np.linspace(3, 6, frames_count)
+    return Trajectory(
+        actor_matrices=Pose.from_axis_angle(np.broadcast_to([0.0, 1.0, 0.0], (frames_count, 3)), angles,
+                                            translations).to_matrix(),
+        camera_matrices=np.broadcast_to(controller.camera.pose, (frames_count, 4, 4)),
+        camera_params=camera_params
+    )
+
+
+@pytest.mark.parametrize('buffer_bytes', [1, 10 ** 5])
+def test_parallel_frames_match_serial(controller, trajectory, buffer_bytes):
+    serial_frames = list(controller.render_trajectory(trajectory))
+    assert all(visible.any() for _, visible in serial_frames)
+    frames_count = 0
+    for (projected, visible), (parallel_projected, parallel_visible) in zip(
+            serial_frames,
+            controller.render_trajectory_parallel(trajectory, workers=2, buffer_bytes=buffer_bytes)
+    ):
+        # The parallel frames are read only views of the shared buffer, checked before the next one is requested
+        assert not parallel_projected.flags.writeable and not parallel_visible.flags.writeable
+        assert np.array_equal(parallel_projected, projected)
+        assert np.array_equal(parallel_visible, visible)
+        frames_count += 1
+
+    assert frames_count == len(trajectory) == controller.trajectory_stats['frames']
+
+
+def test_parallel_frame_readable_after_stream(controller, trajectory):
+    # The last frame view keeps the shared buffer mapped once the stream is over
+    for last_frame in controller.render_trajectory_parallel(trajectory, workers=2):
+        pass
+    projected, visible = list(controller.render_trajectory(trajectory))[-1]
+    assert np.array_equal(last_frame[0], projected) and np.array_equal(last_frame[1], visible)
@@ -1,9 +1,19 @@
+import time
+from math import ceil, sqrt
+
 import numpy as np
 from typing import Callable
-from PyQt5.QtWidgets import *
-from PyQt5.QtCore import *
+from PyQt5.QtWidgets import (
+    QButtonGroup, QDial, QGridLayout, QHBoxLayout, QLabel, QMainWindow, QRadioButton, QShortcut, QSlider, QTabWidget,
+    QVBoxLayout, QWidget
+)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFontDatabase, QKeySequence
 from models.Chart import Chart
 from controllers.MainController import MainController
+from views.main.RasterView import RasterView
+from views.main.RenderScheduler import RenderScheduler
+from views.main.RenderWorker import RenderWorker
 
 
 class MainView(QMainWindow):
@@ -17,6 +27,15 @@ class MainView(QMainWindow):
         self.actor_controls = {}
         self.camera_controls = {}
 
+        # Coalesces the controls changes into at most one render per display frame,
+        # whose geometry is computed at a background thread
+        self.render_scheduler = RenderScheduler(render=self.redraw, parent=self)
+        self.render_scheduler.settled.connect(self.onControlsSettled)
+        self.render_worker = RenderWorker(parent=self)
+
+        # Exporter the camera image is written to each time it's drawn, while recording
+        self.frame_exporter = None
+
         # Setup view layout
         main_layout = QHBoxLayout()
         main_layout.setSpacing(20)
@@ -24,17 +43,22 @@ class MainView(QMainWindow):
         # Setup the camera and world views tab
         self.camera_chart = Chart(
             title='camera view',
-            # ion=True
+            profiler=self.controller.profiler
         )
         self.world_chart = Chart(
             title='world view',
             aspect='equal',
             projection='3d',
-            ion=True
+            profiler=self.controller.profiler
         )
         visualization_tabs = QTabWidget()
         visualization_tabs.addTab(self.worldViewTab(), 'World View')
         visualization_tabs.addTab(self.cameraViewTab(), 'Camera View')
+        visualization_tabs.addTab(self.cameraImageTab(), 'Camera Image')
+        self.camera_grid_views = []
+        self.camera_grid_labels = []
+        if len(self.controller.rig.cameras) > 1:
+            visualization_tabs.addTab(self.cameraGridTab(), 'Camera Grid')
 
         # Setup the controls tabs
         control_tabs = QTabWidget()
@@ -50,6 +74,18 @@ class MainView(QMainWindow):
         main_widget.setLayout(main_layout)
         self.setCentralWidget(main_widget)
 
+        # Overlay of the frame stages times, toggled with F3. The stages are only timed while it's shown,
+        # unless the profiler was already enabled
+        self.profile_overlay = QLabel(main_widget)
+        self.profile_overlay.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        self.profile_overlay.setStyleSheet('background-color: rgba(0, 0, 0, 160); color: white; padding: 6px;')
+        self.profile_overlay.setAttribute(Qt.WA_TransparentForMouseEvents)
+        self.profile_overlay.move(8, 8)
+        self.profile_overlay.hide()
+        self.profile_overlay_time = 0.0
+        self.profiler_enabled = self.controller.profiler.enabled
+        QShortcut(QKeySequence('F3'), self, lambda: self.setProfileOverlayVisible(self.profile_overlay.isHidden()))
+
     def worldViewTab(self):
         # Setup the world view
         tab = QWidget()
@@ -79,6 +115,71 @@ class MainView(QMainWindow):
 
         return tab
 
+    def cameraImageTab(self):
+        # Setup the rasterized camera image
+        tab = QWidget()
+        layout = QVBoxLayout()
+        self.camera_image_view = RasterView()
+        self.camera_image_view.clicked.connect(self.onCameraImageClick)
+        layout.addWidget(self.camera_image_view)
+        tab.setLayout(layout)
+
+        # Draws the camera image
+        self.camera_image_view.set_image(self.controller.draw_camera_image(self.controller.raster).copy())
+
+        return tab
+
+    def cameraGridTab(self):
+        # Setup the images of every rig camera, with their throughput
+        tab = QWidget()
+        layout = QGridLayout()
+        images = self.controller.draw_rig_images()
+        columns = ceil(sqrt(len(images)))
+        for index, image in enumerate(images):
+            label = QLabel()
+            view = RasterView()
+            view.setMinimumSize(160, 160)
+            view.set_image(image.copy())
+            self.camera_grid_labels.append(label)
+            self.camera_grid_views.append(view)
+
+            cell_layout = QVBoxLayout()
+            cell_layout.addWidget(label)
+            cell_layout.addWidget(view)
+            layout.addLayout(cell_layout, index // columns, index % columns)
+        self.updateCameraGridLabels()
+        tab.setLayout(layout)
+
+        return tab
+
+    def setProfileOverlayVisible(self, visible: bool):
+        profiler = self.controller.profiler
+        if visible and not self.profile_overlay.isVisible():
+            self.profiler_enabled = profiler.enabled
+            profiler.enabled = True
+        elif not visible and self.profile_overlay.isVisible():
+            profiler.enabled = self.profiler_enabled
+
+        self.profile_overlay.setVisible(visible)
+        self.updateProfileOverlay()
+
+    def updateProfileOverlay(self):
+        # Lists the p50, p95 and p99 milliseconds of the stages, the slowest first
+        lines = ['{:<24}{:>9}{:>9}{:>9}'.format('stage (ms)', 'p50', 'p95', 'p99')]
+        percentiles = self.controller.profiler.get_percentiles()
+        for name, stage in sorted(percentiles.items(), key=lambda item: -item[1]['p50']):
+            lines.append('{:<24}{:>9.2f}{:>9.2f}{:>9.2f}'.format(
+                name, 1000 * stage['p50'], 1000 * stage['p95'], 1000 * stage['p99']
+            ))
+        self.profile_overlay.setText('\n'.join(lines))
+        self.profile_overlay.adjustSize()
+        self.profile_overlay.raise_()
+        self.profile_overlay_time = time.perf_counter()
+
+    def updateCameraGridLabels(self):
+        for index, (label, stats) in enumerate(zip(self.camera_grid_labels, self.controller.rig_stats)):
+            label.setText('camera {}: {:.1f} fps'.format(index, stats['fps']))
+
     def movementControlsWidget(self, controls: list, callback: Callable):
         # Adds the radio buttons for the reference axis selection
         ref_radio_group = QButtonGroup()
@@ -222,6 +323,28 @@ class MainView(QMainWindow):
         return tab
 
     def onActorControlsChange(self):
+        self.controller.set_interactive(True)
+        self.render_scheduler.schedule(self.applyActorControls)
+
+    def onCameraControlsChange(self):
+        self.controller.set_interactive(True)
+        self.render_scheduler.schedule(self.applyCameraControls)
+
+    def onControlsSettled(self):
+        # Draws the full detail mesh once the controls stop changing
+        self.controller.set_interactive(False)
+        self.render_scheduler.schedule()
+
+    def onCameraImageClick(self, column: int, row: int):
+        # Picks the actor face under the clicked pixel, it's outlined at the next frame
+        face, coordinate = self.controller.pick_camera_image(column, row)
+        if face is None:
+            self.statusBar().showMessage('No face at pixel ({}, {})'.format(column, row))
+        else:
+            self.statusBar().showMessage('Face {} at ({:.2f}, {:.2f}, {:.2f})'.format(face, *coordinate))
+        self.render_scheduler.schedule()
+
+    def applyActorControls(self):
         target_coordinate = np.array([
             self.actor_controls['x_slider'].value(),
             self.actor_controls['y_slider'].value(),
@@ -238,12 +361,8 @@ class MainView(QMainWindow):
             rotation_axis=rotation_axis,
             reference_axis=reference_axis
         )
-        self.controller.draw_world_components(plot_axis=self.world_chart.axis)
-        self.controller.draw_camera_view(plot_axis=self.camera_chart.axis)
-        self.camera_chart.axis_equal()
-        self.world_chart.axis_equal()
 
-    def onCameraControlsChange(self):
+    def applyCameraControls(self):
         target_coordinate = np.array([
             self.camera_controls['x_slider'].value(),
             self.camera_controls['y_slider'].value(),
@@ -270,8 +389,50 @@ class MainView(QMainWindow):
             oy=self.camera_controls['oy_slider'].value()
         )
 
-        self.controller.draw_world_components(plot_axis=self.world_chart.axis)
-        self.controller.draw_camera_view(plot_axis=self.camera_chart.axis)
-        self.camera_chart.axis_equal()
-        self.world_chart.axis_equal()
-
+    def redraw(self):
+        # Prepares the frame away from the GUI thread, while a frame is being prepared only the latest request waits.
+        # Its level of detail is set here, so the scene is only changed at the GUI thread
+        self.controller.update_level()
+        self.render_worker.submit(job=self.controller.prepare_frame, on_finished=self.drawFrame)
+
+    def drawFrame(self, frame: dict, frame_start_time: float):
+        # Only the charts whose components have changed are drawn again, from the data prepared for them. The charts
+        # are rendered (with Agg) later on, when they're painted
+        profiler = self.controller.profiler
+        world_drawn = self.controller.draw_world_components(plot_axis=self.world_chart.axis, frame=frame)
+        if world_drawn:
+            with profiler.span('axis_equal'):
+                self.world_chart.axis_equal()
+            self.world_chart.draw_idle()
+        camera_drawn = self.controller.draw_camera_view(plot_axis=self.camera_chart.axis, frame=frame)
+        if camera_drawn:
+            with profiler.span('axis_equal'):
+                self.camera_chart.axis_equal()
+            self.camera_chart.draw_idle()
+            self.camera_image_view.set_image(self.controller.camera_image)
+            if self.frame_exporter is not None:
+                self.frame_exporter.write(self.controller.camera_image)
+        grid_drawn = bool(self.camera_grid_views) and self.controller.draw_camera_grid(frame)
+        if grid_drawn:
+            for view, image in zip(self.camera_grid_views, self.controller.rig_images):
+                view.set_image(image)
+            self.updateCameraGridLabels()
+
+        # The frame time, from the start of its preparation to its drawing, chooses the level of detail of the next ones
+        if world_drawn or camera_drawn or grid_drawn:
+            frame_seconds = time.perf_counter() - frame_start_time
+            self.controller.record_frame_time(frame_seconds, frame['level'])
+            if profiler.enabled:
+                profiler.record('frame', frame_start_time, frame_seconds)
+
+        # The scene has changed while the frame was prepared, its views are prepared again at the latest state
+        if self.controller.finish_frame(frame):
+            self.render_scheduler.schedule()
+
+        # The overlay is refreshed a few times per second
+        if self.profile_overlay.isVisible() and time.perf_counter() - self.profile_overlay_time > 0.25:
+            self.updateProfileOverlay()
+
+    def closeEvent(self, event):
+        self.render_worker.shutdown()
+        super().closeEvent(event)
@@ -0,0 +1,46 @@
+import numpy as np
+from PyQt5.QtCore import Qt, QRect, pyqtSignal
+from PyQt5.QtGui import QImage, QPainter
+from PyQt5.QtWidgets import QWidget
+
+
+class RasterView(QWidget):
+    # Emitted with the image column and row clicked
+    clicked = pyqtSignal(int, int)
+
+    def __init__(self, parent: QWidget = None):
+        super().__init__(parent)
+        self.image = None
+        self.qimage = None
+        self.setMinimumSize(320, 320)
+
+    def set_image(self, image: np.ndarray):
+        # Wraps the grayscale image buffer without copying it, so the array is kept alive with it
+        self.image = np.ascontiguousarray(image)
+        height, width = self.image.shape
+        self.qimage = QImage(self.image.data, width, height, self.image.strides[0], QImage.Format_Grayscale8)
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.black)
+        if self.qimage is not None:
+            painter.drawImage(self.__get_image_rect(), self.qimage)
+        painter.end()
+
+    def mousePressEvent(self, event):
+        # Maps the clicked widget position to the image pixel under it
+        if self.qimage is None or event.button() != Qt.LeftButton:
+            return super().mousePressEvent(event)
+
+        target = self.__get_image_rect()
+        if target.contains(event.pos()):
+            column = (event.x() - target.x()) * self.qimage.width() // target.width()
+            row = (event.y() - target.y()) * self.qimage.height() // target.height()
+            self.clicked.emit(column, row)
+
+    def __get_image_rect(self):
+        # Keeps the image aspect ratio, centered at the widget
+        size = self.qimage.size().scaled(self.size(), Qt.KeepAspectRatio)
+        return QRect((self.width() - size.width()) // 2, (self.height() - size.height()) // 2,
+                      size.width(), size.height())
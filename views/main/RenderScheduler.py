@@ -0,0 +1,65 @@
+import time
+from collections import deque
+from typing import Callable
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+
+class RenderScheduler(QObject):
+    # Emitted after each render with the achieved renders per second
+    rendered = pyqtSignal(float)
+
+    # Emitted once no update has been scheduled for the settle interval
+    settled = pyqtSignal()
+
+    def __init__(
+            self,
+            render: Callable,
+            interval: int = 16,
+            settle_interval: int = 250,
+            parent: QObject = None
+    ):
+        super().__init__(parent)
+
+        # Renders at most once every interval (in milliseconds), one display frame by default
+        self.render = render
+        self.pending_updates = {}
+        self.render_times = deque(maxlen=60)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(interval)
+        self.timer.timeout.connect(self.flush)
+
+        # Tells when the updates stop coming, every update restarts the countdown
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(settle_interval)
+        self.settle_timer.timeout.connect(self.settled)
+
+    def schedule(self, update: Callable = None):
+        # Queues the update for the next frame, repeated updates are applied only once.
+        # Without an update, only the render is requested
+        if update is not None:
+            self.pending_updates[update] = None
+            self.settle_timer.start()
+        if not self.timer.isActive():
+            self.timer.start()
+
+    def flush(self):
+        # Applies the pending updates, which read the latest controls state, and renders once
+        self.timer.stop()
+        updates = list(self.pending_updates)
+        self.pending_updates.clear()
+        for update in updates:
+            update()
+        self.render()
+
+        self.render_times.append(time.perf_counter())
+        self.rendered.emit(self.render_rate)
+
+    @property
+    def render_rate(self):
+        # Renders per second over the last rendered frames
+        if len(self.render_times) < 2:
+            return 0.0
+        return (len(self.render_times) - 1) / max(self.render_times[-1] - self.render_times[0], 1e-12)
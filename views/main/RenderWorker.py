@@ -0,0 +1,59 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class RenderWorker(QObject):
+    # Emitted from the worker thread, delivered at the GUI thread with the finished job
+    job_finished = pyqtSignal(int, object)
+
+    def __init__(self, parent: QObject = None):
+        super().__init__(parent)
+
+        # A single background thread runs one job at a time, the last job submitted meanwhile waits as pending.
+        # Running jobs are never dropped, so a frame is drawn every job even when they take longer than the
+        # submissions interval
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='RenderWorker')
+        self.generation = 0
+        self.delivered_generation = 0
+        self.running = None
+        self.pending = None
+        self.closed = False
+        self.job_finished.connect(self.__deliver)
+
+    def submit(self, job: Callable, on_finished: Callable):
+        # Runs the job at the worker thread and then on_finished, with its result and the time it started, at the
+        # GUI thread. While a job runs, the new one replaces the pending job, which hasn't started yet
+        if self.closed:
+            return
+
+        self.generation += 1
+        self.pending = (self.generation, job, on_finished)
+        if self.running is None:
+            self.__start_pending()
+
+    def shutdown(self):
+        self.closed = True
+        self.pending = None
+        self.executor.shutdown(wait=False)
+
+    def __start_pending(self):
+        generation, job, on_finished = self.pending
+        self.pending = None
+        self.running = (generation, on_finished, time.perf_counter())
+        future = self.executor.submit(job)
+        future.add_done_callback(lambda future: self.job_finished.emit(generation, future))
+
+    def __deliver(self, generation: int, future):
+        # Draws the finished job unless a newer one is already on screen, then starts the pending job
+        _, on_finished, start_time = self.running
+        self.running = None
+        try:
+            if generation > self.delivered_generation and not self.closed:
+                self.delivered_generation = generation
+                on_finished(future.result(), start_time)
+        finally:
+            if self.pending is not None and not self.closed:
+                self.__start_pending()